@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { AlertTriangle, TrendingUp, Sun, Zap, Calendar, Activity } from 'lucide-react';
 import { useSettings, useDeviceSettings } from '../contexts/SettingsContext';
 import { useTheme } from '../contexts/ThemeContext';
@@ -9,7 +9,7 @@ import { EnergyHistoryChart } from '../components/charts/EnergyHistoryChart';
 import { Link } from 'react-router-dom';
 import {
   getLatestDataPoint,
-  getRealtimeData,
+  getRealtimeUpdates,
   getEnergySummary,
   getDailyEnergyHistory
 } from '../services/apiService';
@@ -20,6 +20,10 @@ import { CSVExportButton } from '../components/common/CSVExportButton';
 import { motion } from 'framer-motion';
 
 
+// Realtime chart window; after the first load only the buckets around the cursor are fetched
+const REALTIME_WINDOW = '5m';
+const REALTIME_WINDOW_MS = 5 * 60 * 1000;
+
 const DashboardPage = () => {
   const { currentDeviceId, isGenerator, simulationMode, activeSimulations, totalSimulatedWatts, stopSimulation, getSimulatedReading, simulatedEnergy } = useDevice();
 
@@ -37,6 +41,7 @@ const DashboardPage = () => {
   const [custoHoje, setCustoHoje] = useState(null);
   const [custoMes, setCustoMes] = useState(null);
   const [realtimeData, setRealtimeData] = useState([]);
+  const realtimeCursor = useRef(null);
 
   const [needsAttention, setNeedsAttention] = useState(false);
 
@@ -132,6 +137,7 @@ const DashboardPage = () => {
   // 1. FAST POLLING: Realtime Data (Power, Current, Graphs)
   useEffect(() => {
     let isMounted = true;
+    realtimeCursor.current = null; // New device/mode: start again from a full window
 
     const fetchRealtime = async () => {
       if (!isMounted) return;
@@ -159,7 +165,7 @@ const DashboardPage = () => {
           // --- REAL MODE ---
           const [latest, realtime] = await Promise.all([
             getLatestDataPoint(currentDeviceId),
-            getRealtimeData(currentDeviceId)
+            getRealtimeUpdates(REALTIME_WINDOW, currentDeviceId, realtimeCursor.current)
           ]);
 
           if (isMounted && latest) {
@@ -168,7 +174,25 @@ const DashboardPage = () => {
             if (pwr === undefined && voltage) pwr = latest.current * voltage;
             setPowerInWatts(pwr);
           }
-          if (isMounted && realtime) setRealtimeData(realtime);
+          if (isMounted && realtime) {
+            const incremental = realtimeCursor.current !== null && realtime.cursor !== null;
+            realtimeCursor.current = realtime.cursor;
+            if (incremental) {
+              // The update re-sends the still-open bucket and any bucket that got late readings:
+              // replace points by timestamp, then drop the ones that slid out of the window
+              const oldest = Date.now() - REALTIME_WINDOW_MS;
+              setRealtimeData(prev => {
+                const byTime = new Map(prev.map(point => [new Date(point.time).getTime(), point]));
+                realtime.points.forEach(point => byTime.set(new Date(point.time).getTime(), point));
+                return [...byTime.entries()]
+                  .filter(([time]) => time >= oldest)
+                  .sort(([a], [b]) => a - b)
+                  .map(([, point]) => point);
+              });
+            } else {
+              setRealtimeData(realtime.points);
+            }
+          }
         }
       } catch (error) {
         console.error("Realtime fetch error:", error);
@@ -32,6 +32,26 @@ const appendDevice = (url, deviceId) => {
   return `${url}${separator}device_id=${encodeURIComponent(deviceId)}`;
 };
 
+// Columnar series: { t: [epoch ms], v: [...], peak?: [...], delta?: true } -> [{ time, current, peak? }]
+// Timestamps may come delta-encoded (each value is the difference to the previous one).
+export const decodeColumnar = (body) => {
+  if (!body || !Array.isArray(body.t)) return body;
+  const extra = Object.keys(body).filter(key => Array.isArray(body[key]) && key !== 't' && key !== 'v');
+  const points = new Array(body.t.length);
+  let time = 0;
+  for (let i = 0; i < body.t.length; i++) {
+    time = body.delta ? time + body.t[i] : body.t[i];
+    const point = { time: new Date(time).toISOString(), current: body.v[i] };
+    for (const key of extra) {
+      if (body[key][i] !== null) point[key] = body[key][i];
+    }
+    points[i] = point;
+  }
+  return points;
+};
+
+const COLUMNAR = 'format=columnar&delta=1';
+
 export const getDevices = async () => {
   return await fetchWithFallback('data?type=devices', {}, () => mockApiService.getDevices());
 };
@@ -40,8 +60,13 @@ export const getLatestDataPoint = async (deviceId) => {
   return await fetchWithFallback(appendDevice('latest', deviceId), {}, () => mockApiService.getLatestDataPoint(deviceId));
 };
 
-export const getRealtimeData = async (windowSize = '5m', deviceId) => {
-  return await fetchWithFallback(appendDevice(`data?window=${windowSize}`, deviceId), {}, () => mockApiService.getRealtimeData(windowSize, deviceId));
+// Incremental realtime fetch: with `since` (the cursor from the previous call) only the buckets around it come back.
+// The first call omits `since`, so the full window can be served from the API cache; it still returns a cursor.
+// Returns { points, cursor }; cursor is null when the data came from the mock (no incremental support).
+export const getRealtimeUpdates = async (windowSize = '5m', deviceId, since = null) => {
+  const cursorParam = since !== null ? `&since=${since}` : '';
+  const body = await fetchWithFallback(appendDevice(`data?window=${windowSize}&${COLUMNAR}${cursorParam}`, deviceId), {}, () => mockApiService.getRealtimeData(windowSize, deviceId));
+  return { points: decodeColumnar(body), cursor: body && body.cursor !== undefined ? body.cursor : null };
 };
 
 export const getEnergySummary = async (deviceId) => {
@@ -0,0 +1,68 @@
+# benchmarks/bench_binary_frame.py
+#
+# Tamanho do corpo e custo de decodificação dos frames binários (por
+# codificação) comparados ao JSON em lote, até o payload de line protocol.
+#
+# Uso: python infra/benchmarks/bench_binary_frame.py [--samples 10000]
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault('MAX_BATCH_SIZE', '1000000')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_function'))
+
+import binary_frame  # noqa: E402
+from readings import extract_readings, build_points  # noqa: E402
+
+
+def make_samples(count):
+    # Senoide de 60 Hz amostrada a 1 kHz com ruído determinístico, como um sensor de corrente
+    return [round(10 * math.sin(2 * math.pi * 60 * i / 1000) + (i % 7) * 0.01, 3) for i in range(count)]
+
+
+def run_json(body):
+    readings, default_device, _ = extract_readings(json.loads(body))
+    points, _ = build_points(readings, default_device)
+    return '\n'.join(point.to_line_protocol() for point in points).encode()
+
+
+def timed(fn, body, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    base_ts = int(time.time() * 1000) - args.samples
+    samples = make_samples(args.samples)
+    bodies = [('json', run_json, json.dumps({'device_id': 'esp32-01', 'readings': [
+        {'current': value, 'timestamp': base_ts + i} for i, value in enumerate(samples)]}).encode())]
+    for name, encoding in (('float32', binary_frame.ENCODING_FLOAT32), ('int16', binary_frame.ENCODING_INT16),
+                           ('delta', binary_frame.ENCODING_DELTA_VARINT)):
+        body = binary_frame.encode_frame('esp32-01', base_ts, 1000, samples, encoding=encoding)
+        bodies.append((name, binary_frame.decode, body))
+
+    json_size = len(bodies[0][2])
+    json_time = None
+    print(f'{"formato":>8} {"bytes":>10} {"bytes/amostra":>14} {"tempo (ms)":>11} {"amostras/s":>12} {"vs json":>8}')
+    for name, fn, body in bodies:
+        elapsed = timed(fn, body, args.repeat)
+        json_time = json_time or elapsed
+        print(f'{name:>8} {len(body):>10,} {len(body) / args.samples:>14.2f} {elapsed * 1000:>11,.1f} '
+              f'{args.samples / elapsed:>12,.0f} {json_time / elapsed:>7.1f}x  (tamanho {json_size / len(body):.1f}x menor)')
+
+
+if __name__ == '__main__':
+    main()
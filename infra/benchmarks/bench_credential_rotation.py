@@ -0,0 +1,116 @@
+# benchmarks/bench_credential_rotation.py
+#
+# Rotação do token do InfluxDB no meio de uma sequência de requisições à
+# Lambda de leitura, contra o InfluxDB simulado local (que passa a recusar o
+# token antigo com 401) e um Secrets Manager simulado por LOCAL_SECRET_FILE
+# com latência artificial. Compara o cache "para sempre" (comportamento
+# anterior) com o CredentialCache sem e com a janela de stale: quantas
+# requisições o InfluxDB recusou (e quantas a Lambda respondeu com 502), quantas
+# buscas de segredo foram feitas e o tempo por requisição (p50 e máximo, onde
+# aparece a busca síncrona).
+#
+# Uso: python infra/benchmarks/bench_credential_rotation.py [--requests 400] [--ttl 0.2] [--secret-ms 30]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_read_data'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'shared'))
+
+from influx_standin import InfluxStandIn  # noqa: E402
+from bench_read_routes import make_datasets, make_responder  # noqa: E402
+
+EVENT = {'path': '/latest', 'queryStringParameters': {'device_id': 'esp32-01'}}
+
+
+def write_secret(path, token):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'INFLUXDB_INIT_ADMIN_TOKEN': token, 'INFLUXDB_ORG': 'bench', 'INFLUXDB_BUCKET': 'bench'}, f)
+
+
+class ForeverCache:
+    # Comportamento anterior: o segredo é buscado uma vez e nunca mais
+    def __init__(self, loader):
+        self.loader = loader
+        self.value = None
+
+    def get(self):
+        if self.value is None:
+            self.value = self.loader()
+        return self.value
+
+    def call(self, fn, creds=None):
+        return fn(creds if creds is not None else self.get())
+
+    def stats(self):
+        return {}
+
+
+def run(read_data, standin, secret_path, cache, requests):
+    write_secret(secret_path, 'token-1')
+    standin.token = 'token-1'
+    read_data.credential_cache = cache
+    cache.get()
+    standin.reset()
+    timings = []
+    failures = 0
+    for index in range(requests):
+        if index == requests // 2:
+            write_secret(secret_path, 'token-2')
+            standin.token = 'token-2'
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # logs de cache e de erro do handler
+            response = read_data.handler(EVENT, None)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response['statusCode'] != 200:
+            assert response['statusCode'] == 502, response  # InfluxDB recusou o token
+            failures += 1
+    return timings, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--ttl', type=float, default=0.2, help='CREDENTIALS_TTL_SECONDS usado no cache')
+    parser.add_argument('--secret-ms', type=float, default=30.0, help='latência simulada do Secrets Manager')
+    args = parser.parse_args()
+
+    with InfluxStandIn() as standin, tempfile.TemporaryDirectory() as directory:
+        secret_path = os.path.join(directory, 'secret.json')
+        write_secret(secret_path, 'token-1')
+        standin.query_responder = make_responder(make_datasets(100))
+        os.environ.update(INFLUXDB_URL=standin.url, LOCAL_SECRET_FILE=secret_path, CACHE_MAX_ENTRIES='0',
+                          BOOTSTRAP_ON_INIT='0')
+        import credentials
+        import read_data
+
+        fetches = []
+
+        def slow_fetch():
+            fetches.append(time.perf_counter())
+            time.sleep(args.secret_ms / 1000)
+            return credentials.fetch()
+
+        strategies = [
+            ('para sempre (anterior)', ForeverCache(slow_fetch)),
+            ('TTL, sem stale', credentials.CredentialCache(slow_fetch, ttl=args.ttl, stale=0)),
+            ('TTL + stale (padrão)', credentials.CredentialCache(slow_fetch, ttl=args.ttl)),
+        ]
+        print(f'{"cache":<24} {"401s":>5} {"502s":>5} {"buscas":>7} {"p50 (ms)":>9} {"máx (ms)":>9}  contadores')
+        for label, cache in strategies:
+            fetches.clear()
+            timings, failures = run(read_data, standin, secret_path, cache, args.requests)
+            time.sleep(args.secret_ms / 1000 * 2)  # deixa uma renovação em segundo plano terminar
+            print(f'{label:<24} {standin.unauthorized:>5} {failures:>5} {len(fetches):>7} {statistics.median(timings):>9.1f}'
+                  f' {max(timings):>9.1f}  {cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_first_request.py
+#
+# Primeira requisição de um ambiente novo da Lambda, com e sem o bootstrap na
+# fase de init (BOOTSTRAP_ON_INIT). Cada caso roda em um interpretador novo,
+# como um cold start: mede o import do handler (init), a primeira invocação e
+# a mediana das seguintes (regime), contra o InfluxDB simulado local com um
+# atraso em cada conexão nova no lugar do handshake TCP/TLS. O segredo vem do
+# stand-in local (LOCAL_SECRET_JSON), então a latência do Secrets Manager não
+# entra na conta.
+#
+# Uso: python infra/benchmarks/bench_first_request.py [--handshake-ms 30] [--repeat 20] [--build]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+INFRA_DIR = os.path.join(BENCH_DIR, '..')
+SHARED_DIR = os.path.join(INFRA_DIR, 'shared')
+HANDLERS = {'lambda_function': 'index', 'lambda_read_data': 'read_data'}
+SECRET = {'INFLUXDB_INIT_ADMIN_TOKEN': 'bench', 'INFLUXDB_ORG': 'bench', 'INFLUXDB_BUCKET': 'bench'}
+
+
+def make_event(name, index):
+    if name == 'lambda_function':
+        reading = {'device_id': 'esp32-01', 'current': 1.5 + index / 100, 'timestamp': int(time.time() * 1000) + index}
+        return {'body': json.dumps(reading)}
+    return {'path': '/latest', 'queryStringParameters': {'device_id': 'esp32-01'}}
+
+
+def child(name, repeat):
+    # Roda dentro do interpretador novo: init, primeira invocação e regime
+    started = time.perf_counter()
+    handler = __import__(HANDLERS[name]).handler
+    init_ms = (time.perf_counter() - started) * 1000
+    timings = []
+    for index in range(repeat + 1):
+        started = time.perf_counter()
+        response = handler(make_event(name, index), None)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response['statusCode'] == 200, response
+    print(json.dumps({'init_ms': init_ms, 'first_ms': timings[0], 'steady_ms': statistics.median(timings[1:])}))
+
+
+def run_case(name, path, url, bootstrap, repeat):
+    # infra/shared vem depois do diretório da Lambda: no pacote gerado, as cópias já estão nele
+    env = dict(os.environ, INFLUXDB_URL=url, LOCAL_SECRET_JSON=json.dumps(SECRET), BOOTSTRAP_ON_INIT=bootstrap,
+               CACHE_MAX_ENTRIES='0', PYTHONPATH=os.pathsep.join([path, SHARED_DIR, BENCH_DIR]))
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, '--repeat', str(repeat)],
+                            cwd=path, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'{name} falhou:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--handshake-ms', type=float, default=30.0, help='atraso simulado por conexão nova')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='latência simulada por requisição')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--build', action='store_true', help='usa infra/build/<lambda> (python infra/build_lambdas.py)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.repeat)
+
+    from bench_read_routes import make_datasets, make_responder
+    from influx_standin import InfluxStandIn
+
+    print(f'{"lambda":<18} {"bootstrap":<10} {"init (ms)":>10} {"1ª req. (ms)":>13} {"regime p50 (ms)":>16}')
+    with InfluxStandIn(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms) as standin:
+        standin.query_responder = make_responder(make_datasets(100))
+        # Nome em vez de IP, para a resolução de DNS entrar na conta
+        url = standin.url.replace('127.0.0.1', 'localhost')
+        for name in HANDLERS:
+            path = os.path.join(INFRA_DIR, 'build' if args.build else '', name)
+            for bootstrap in ('0', '1'):
+                result = run_case(name, path, url, bootstrap, args.repeat)
+                print(f'{name:<18} {"sim" if bootstrap == "1" else "não":<10} {result["init_ms"]:>10.1f}'
+                      f' {result["first_ms"]:>13.1f} {result["steady_ms"]:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
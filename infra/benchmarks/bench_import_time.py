@@ -0,0 +1,92 @@
+# benchmarks/bench_import_time.py
+#
+# Custo de import do handler de cada Lambda (a maior parte do cold start),
+# medido com "python -X importtime" em um interpretador novo a cada repetição:
+# o diretório da Lambda como está no repositório contra o pacote gerado por
+# infra/build_lambdas.py (infra/build/<lambda>). Mostra a mediana do tempo
+# total de import, quantos módulos foram carregados (e quantos do
+# influxdb_client) e os imports diretos mais caros do módulo no pacote de
+# deploy. Os .pyc vão para um diretório temporário (PYTHONPYCACHEPREFIX) e a
+# primeira execução só os gera, como os .pyc pré-compilados do deploy.
+#
+# Requer o pacote gerado antes:
+#   python infra/build_lambdas.py
+#
+# Uso: python infra/benchmarks/bench_import_time.py [--repeat 7] [--module lambda_read_data=flux_csv]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+INFRA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SHARED_DIR = os.path.join(INFRA_DIR, 'shared')
+HANDLERS = {'lambda_function': 'index', 'lambda_read_data': 'read_data'}
+# O handler lê a configuração do ambiente no import; sem bootstrap, mede só o import
+ENV = {'INFLUXDB_URL': 'http://127.0.0.1:8086', 'SECRET_ARN': 'bench', 'BOOTSTRAP_ON_INIT': '0'}
+
+
+def import_profile(path, module, python, cache):
+    """Linhas (self µs, cumulativo µs, nível, módulo) do -X importtime para ``import module``."""
+    # infra/shared vem depois do diretório da Lambda: no pacote gerado, as cópias já estão nele
+    env = dict(os.environ, **ENV, PYTHONPATH=os.pathsep.join([path, SHARED_DIR]), PYTHONPYCACHEPREFIX=cache)
+    result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'], cwd=path, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} falhou em {path}:\n{result.stderr.splitlines()[-1]}')
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2  # 0 = importado pelo próprio -c
+        rows.append((int(own), int(cumulative), level, name.strip()))
+    return rows
+
+
+def direct_imports(rows, module):
+    # Saída em pós-ordem: os filhos diretos (nível 1) vêm logo antes da linha do próprio módulo
+    end = next(i for i, row in enumerate(rows) if row[2] == 0 and row[3] == module)
+    start = end
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    return [row for row in rows[start:end] if row[2] == 1]
+
+
+def measure(path, module, python, repeat):
+    totals = []
+    with tempfile.TemporaryDirectory() as cache:
+        import_profile(path, module, python, cache)  # gera os .pyc
+        for _ in range(repeat):
+            rows = import_profile(path, module, python, cache)
+            totals.append(sum(own for own, _, _, _ in rows) / 1000)
+    influx = sum(1 for row in rows if row[3].split('.')[0] == 'influxdb_client')
+    return statistics.median(totals), len(rows), influx, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--module', action='append', default=[], metavar='LAMBDA=MÓDULO',
+                        help='módulo importado em vez do handler (ex. lambda_function=influx_pool)')
+    parser.add_argument('--top', type=int, default=8, help='imports diretos mais caros listados')
+    args = parser.parse_args()
+    modules = dict(HANDLERS, **dict(item.split('=', 1) for item in args.module))
+
+    print(f'{"lambda":<18} {"módulo":<14} {"pacote":<12} {"import p50 (ms)":>15} {"módulos":>8} {"influxdb":>9}')
+    for name, module in modules.items():
+        build = os.path.join(INFRA_DIR, 'build', name)
+        if not os.path.isdir(build):
+            sys.exit(f'{build} não existe: rode "python infra/build_lambdas.py" antes')
+        for label, path in (('repositório', os.path.join(INFRA_DIR, name)), ('build', build)):
+            median, count, influx, rows = measure(path, module, args.python, args.repeat)
+            print(f'{name:<18} {module:<14} {label:<12} {median:>15.1f} {count:>8} {influx:>9}')
+        for _, cumulative, _, imported in sorted(direct_imports(rows, module), key=lambda r: -r[1])[:args.top]:
+            print(f'{"":<46} {cumulative / 1000:>8.1f} ms  {imported}')
+
+
+if __name__ == '__main__':
+    main()
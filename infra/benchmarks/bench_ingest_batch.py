@@ -0,0 +1,91 @@
+# benchmarks/bench_ingest_batch.py
+#
+# Compara a ingestão leitura-a-leitura (um cliente e uma escrita por
+# invocação, como o handler fazia) com a ingestão em lote (uma escrita de
+# line protocol por requisição) contra o InfluxDB local simulado, com e sem
+# reaproveitamento do cliente entre invocações (influx_pool).
+#
+# Uso: python infra/benchmarks/bench_ingest_batch.py [--readings 2000] [--latency-ms 2]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_function'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'shared'))
+
+from influxdb_client import InfluxDBClient  # noqa: E402
+from influxdb_client.client.write_api import SYNCHRONOUS  # noqa: E402
+import influx_pool  # noqa: E402
+from readings import build_points  # noqa: E402
+from influx_standin import InfluxStandIn  # noqa: E402
+
+BUCKET = 'wiresense'
+ORG = 'wiresense'
+
+
+def make_readings(count, devices=4):
+    base = int(time.time() * 1000)
+    return [
+        {'device_id': f'esp32-{i % devices}', 'current': 1.5 + (i % 100) / 100, 'timestamp': base + i}
+        for i in range(count)
+    ]
+
+
+def bench_single(url, readings):
+    start = time.perf_counter()
+    for reading in readings:
+        with InfluxDBClient(url=url, token='bench', org=ORG) as client:
+            write_api = client.write_api(write_options=SYNCHRONOUS)
+            points, precision = build_points([reading])
+            write_api.write(bucket=BUCKET, org=ORG, record=points, write_precision=precision)
+    return time.perf_counter() - start
+
+
+def bench_batch(url, readings, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(readings), batch_size):
+        with InfluxDBClient(url=url, token='bench', org=ORG) as client:
+            write_api = client.write_api(write_options=SYNCHRONOUS)
+            points, precision = build_points(readings[i:i + batch_size])
+            write_api.write(bucket=BUCKET, org=ORG, record=points, write_precision=precision)
+    return time.perf_counter() - start
+
+
+def bench_pooled(url, readings, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(readings), batch_size):
+        points, precision = build_points(readings[i:i + batch_size])
+        # O cliente do pool escreve line protocol já serializado, como o handler
+        payload = '\n'.join(point.to_line_protocol() for point in points).encode()
+        influx_pool.call_with_retry(url, 'bench', ORG, lambda client: influx_pool.write_api_for(client).write(
+            bucket=BUCKET, org=ORG, record=payload, write_precision=precision))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readings', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='latência simulada do InfluxDB por requisição')
+    args = parser.parse_args()
+
+    readings = make_readings(args.readings)
+    with InfluxStandIn(latency_ms=args.latency_ms) as standin:
+        elapsed = bench_single(standin.url, readings)
+        print(f'{"uma leitura/requisição":<28} {args.readings / elapsed:>12,.0f} leituras/s  '
+              f'({standin.requests} requisições)')
+        for batch_size in (100, 1000, 5000):
+            standin.reset()
+            elapsed = bench_batch(standin.url, readings, batch_size)
+            print(f'{f"lote de {batch_size}":<28} {args.readings / elapsed:>12,.0f} leituras/s  '
+                  f'({standin.requests} requisições, {standin.lines} linhas)')
+        for batch_size in (1, 100):
+            standin.reset()
+            elapsed = bench_pooled(standin.url, readings, batch_size)
+            print(f'{f"lote de {batch_size} (pool)":<28} {args.readings / elapsed:>12,.0f} leituras/s  '
+                  f'({standin.requests} requisições, {influx_pool.stats()})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_ingest_formats.py
+#
+# Custo de CPU por requisição de cada formato de ingestão, do corpo bruto até
+# o payload de line protocol pronto para o WriteApi:
+#   json  -> json.loads + validação + Point + to_line_protocol (caminho original)
+#   lp    -> scanner de line protocol (bytes repassados sem cópia)
+#   csv   -> CSV compacto convertido direto em line protocol
+#
+# Uso: python infra/benchmarks/bench_ingest_formats.py [--sizes 1000 10000 100000]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('MAX_BATCH_SIZE', '1000000')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_function'))
+
+import line_protocol  # noqa: E402
+from readings import extract_readings, build_points, WRITE_PRECISION  # noqa: E402
+
+
+def make_bodies(count, devices=8):
+    base = int(time.time() * 1000) - count
+    rows = [(f'esp32-{i % devices}', base + i, round(1.5 + (i % 100) / 100, 2)) for i in range(count)]
+    as_json = json.dumps({'readings': [{'device_id': d, 'timestamp': t, 'current': c} for d, t, c in rows]}).encode()
+    as_lp = '\n'.join(f'environment,device={d} current={c} {t}' for d, t, c in rows).encode()
+    as_csv = ('device,timestamp,current\n' + '\n'.join(f'{d},{t},{c}' for d, t, c in rows)).encode()
+    return as_json, as_lp, as_csv
+
+
+def run_json(body):
+    readings, default_device, _ = extract_readings(json.loads(body))
+    points, _ = build_points(readings, default_device)
+    return '\n'.join(point.to_line_protocol() for point in points).encode()
+
+
+def run_lp(body):
+    line_protocol.scan(body, WRITE_PRECISION)
+    return body
+
+
+def run_csv(body):
+    return line_protocol.csv_to_line_protocol(body, WRITE_PRECISION)[0]
+
+
+def timed(fn, body, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"linhas":>8} {"formato":>7} {"corpo (KiB)":>12} {"tempo (ms)":>11} {"linhas/s":>12} {"vs json":>8}')
+    for size in args.sizes:
+        bodies = make_bodies(size)
+        baseline = None
+        for name, fn, body in zip(('json', 'lp', 'csv'), (run_json, run_lp, run_csv), bodies):
+            elapsed = timed(fn, body, args.repeat)
+            baseline = baseline or elapsed
+            print(f'{size:>8} {name:>7} {len(body) / 1024:>12,.0f} {elapsed * 1000:>11,.1f} '
+                  f'{size / elapsed:>12,.0f} {baseline / elapsed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_read_range.py
+#
+# Custo de uma consulta "range" na Lambda de leitura, da resposta HTTP do
+# InfluxDB até o corpo JSON, contra um InfluxDB simulado local:
+#   records -> query() + FluxRecord + dict por linha + isoformat + json.dumps (caminho original)
+#   csv     -> query_raw() sem anotações + flux_csv (colunas por índice, JSON incremental)
+#   columnar-> mesmo caminho, resposta colunar {"t": [epoch ms], "v": [...]} com timestamps delta
+#
+# Uso: python infra/benchmarks/bench_read_range.py [--rows 10000 100000]
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_read_data'))
+
+import flux_csv  # noqa: E402
+from influxdb_client import InfluxDBClient  # noqa: E402
+from influx_standin import InfluxStandIn  # noqa: E402
+
+COLUMNS = ['result', 'table', '_start', '_stop', '_time', '_measurement', 'device', 'current_max', 'current_mean']
+ANNOTATIONS = [
+    '#datatype,string,long,dateTime:RFC3339,dateTime:RFC3339,dateTime:RFC3339,string,string,double,double',
+    '#group,false,false,true,true,false,true,true,false,false',
+    '#default,_result,,,,,,,,',
+]
+QUERY = 'from(bucket: param_bucket) |> range(start: param_start)'
+
+
+def make_responder(rows):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    stop = start + timedelta(seconds=10 * rows)
+    bounds = f'{start:%Y-%m-%dT%H:%M:%SZ},{stop:%Y-%m-%dT%H:%M:%SZ}'
+    data = [
+        f'0,{bounds},{start + timedelta(seconds=10 * i):%Y-%m-%dT%H:%M:%SZ},environment_window,esp32-01,'
+        f'{round(5 + (i % 70) / 10, 2)},{round(2 + (i % 50) / 10, 2)}'
+        for i in range(rows)
+    ]
+    annotated = '\r\n'.join(ANNOTATIONS + [',' + ','.join(COLUMNS)] + [',,' + row for row in data]).encode() + b'\r\n\r\n'
+    plain = '\r\n'.join([',' + ','.join(COLUMNS)] + [',_result,' + row for row in data]).encode() + b'\r\n\r\n'
+    return lambda request: annotated if request.get('dialect', {}).get('annotations') else plain
+
+
+def run_records(client):
+    # Caminho original: query_influx + lista de dicts do handler + json.dumps
+    results = []
+    for table in client.query_api().query(QUERY, org='bench'):
+        for record in table.records:
+            record_dict = record.values
+            for k in ['_time', 'x']:
+                if k in record_dict and isinstance(record_dict[k], datetime):
+                    record_dict[k] = record_dict[k].isoformat()
+            results.append(record_dict)
+    body = [{"time": r.get('_time'), "current": r.get('current_mean'), "peak": r.get('current_max')} for r in results]
+    return json.dumps(body, default=str)
+
+
+def run_csv(client):
+    return flux_csv.stream_json(client, QUERY, 'bench', None, ['_time', 'current_mean', 'current_max'],
+                                lambda rows: flux_csv.write_json(rows, ['time', 'current', 'peak']))[0]
+
+
+def run_columnar(client):
+    return flux_csv.stream_json(client, QUERY, 'bench', None, ['_time', 'current_mean', 'current_max'],
+                                lambda rows: flux_csv.write_columnar(rows, ['time', 'current', 'peak'], delta=True))[0]
+
+
+def measure(fn, client, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(client)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    fn(client)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"linhas":>8} {"caminho":>8} {"tempo (ms)":>11} {"pico (MiB)":>11} {"json (KiB)":>11}  vs records')
+    with InfluxStandIn() as standin, InfluxDBClient(url=standin.url, token='bench', org='bench') as client:
+        for rows in args.rows:
+            standin.query_responder = make_responder(rows)
+            baseline = None
+            for name, fn in (('records', run_records), ('csv', run_csv), ('columnar', run_columnar)):
+                elapsed, peak, body = measure(fn, client, args.repeat)
+                decoded = json.loads(body)
+                assert len(decoded['t'] if isinstance(decoded, dict) else decoded) == rows
+                baseline = baseline or (elapsed, peak)
+                print(f'{rows:>8} {name:>8} {elapsed * 1000:>11.1f} {peak / 2 ** 20:>11.1f} {len(body) / 1024:>11.0f}'
+                      f'  {baseline[0] / elapsed:.1f}x tempo, {baseline[1] / peak:.1f}x memória')
+
+
+if __name__ == '__main__':
+    main()
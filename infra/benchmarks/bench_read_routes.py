@@ -0,0 +1,130 @@
+# benchmarks/bench_read_routes.py
+#
+# Custo de cada rota da Lambda de leitura, do evento do API Gateway até o corpo
+# da resposta, contra um InfluxDB simulado local (sem cache: toda requisição é
+# um MISS). Para cada rota mostra a mediana do tempo, quantas consultas Flux
+# ela fez e o tamanho da resposta diante do limite declarado na rota.
+#
+# Requer as dependências da Lambda de leitura (influxdb_client).
+#
+# Uso: python infra/benchmarks/bench_read_routes.py [--rows 20000] [--repeat 20]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_read_data'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'shared'))
+
+from influx_standin import InfluxStandIn  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+REQUESTS = [
+    ('/devices', {}),
+    ('/latest', {'device_id': 'esp32-01'}),
+    ('/data', {'window': '24h', 'device_id': 'esp32-01'}),
+    ('/data', {'window': '24h', 'device_id': 'esp32-01', 'format': 'columnar', 'delta': '1'}),
+    ('/summary', {'device_id': 'esp32-01'}),
+    ('/history/daily', {'limit': '30', 'device_id': 'esp32-01'}),
+    ('/history/monthly', {'limit': '12', 'device_id': 'esp32-01'}),
+    ('/history/peak', {'limit': '30', 'device_id': 'esp32-01'}),
+]
+
+
+def rfc3339(moment):
+    return f'{moment:%Y-%m-%dT%H:%M:%SZ}'
+
+
+def csv_table(columns, rows, annotated):
+    # Tabela única no formato do InfluxDB; com anotações para query(), sem para query_raw() (flux_csv)
+    names = ['result', 'table'] + [name for name, _ in columns]
+    lines = []
+    if annotated:
+        lines.append('#datatype,string,long,' + ','.join(datatype for _, datatype in columns))
+        lines.append('#group,' + ','.join(['false'] * len(names)))
+        lines.append('#default,_result' + ',' * (len(names) - 1))
+    lines.append(',' + ','.join(names))
+    lines.extend(',_result,0,' + ','.join(str(value) for value in row) for row in rows)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+def make_datasets(rows):
+    days = [START + timedelta(days=i) for i in range(30)]
+    return {
+        'devices': ([('_value', 'string')], [[f'esp32-{i:02d}'] for i in range(20)]),
+        'latest': ([('_time', 'dateTime:RFC3339'), ('_value', 'double'), ('_field', 'string'), ('device', 'string')],
+                   [[rfc3339(START), 7.5, 'current_mean', 'esp32-01']]),
+        'range': ([('_time', 'dateTime:RFC3339'), ('current_max', 'double'), ('current_mean', 'double'),
+                   ('device', 'string')],
+                  [[rfc3339(START + timedelta(seconds=10 * i)), round(5 + (i % 70) / 10, 2),
+                    round(2 + (i % 50) / 10, 2), 'esp32-01'] for i in range(rows)]),
+        'summary': ([('_measurement', 'string'), ('period', 'string'), ('_value', 'double')],
+                    [['energia_integrada', period, 12.5] for period in ('today', 'yesterday', 'month', 'previous_month')]),
+        'history': ([('x', 'dateTime:RFC3339'), ('y', 'double')], [[rfc3339(day), 10.25] for day in days]),
+        'peak': ([('_time', 'dateTime:RFC3339'), ('device', 'string'), ('current_max', 'double'), ('max_time', 'long'),
+                  ('samples', 'long'), ('histogram', 'string')],
+                 [[rfc3339(day + timedelta(microseconds=env)), 'esp32-01', 18.5 + env,
+                   int((day + timedelta(hours=19)).timestamp() * 1000), 8640,
+                   ' '.join(f'{bin_}:{40 + bin_ % 7}' for bin_ in range(100, 150))]
+                  for day in days for env in (1, 2)]),
+    }
+
+
+def make_responder(datasets):
+    def dataset_for(query):
+        if 'schema.tagValues' in query:
+            return 'devices'
+        if 'pico_diario' in query:
+            return 'peak'
+        if 'previous_month' in query:
+            return 'summary'
+        if 'energia_' in query:
+            return 'history'
+        if 'environment_window' in query and 'last()' in query:
+            return 'latest'
+        return 'range'
+
+    def respond(request):
+        columns, rows = datasets[dataset_for(request['query'])]
+        return csv_table(columns, rows, bool(request.get('dialect', {}).get('annotations')))
+    return respond
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000, help='linhas da série de /data')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with InfluxStandIn() as standin:
+        standin.query_responder = make_responder(make_datasets(args.rows))
+        os.environ['INFLUXDB_URL'] = standin.url
+        os.environ['LOCAL_SECRET_JSON'] = json.dumps(
+            {'INFLUXDB_INIT_ADMIN_TOKEN': 'bench', 'INFLUXDB_ORG': 'bench', 'INFLUXDB_BUCKET': 'bench'})
+        import read_data
+        from result_cache import ResultCache
+        read_data.result_cache = ResultCache(max_entries=0)  # sem cache: mede a consulta de cada rota
+
+        print(f'{"rota":<44} {"tempo p50 (ms)":>14} {"consultas":>9} {"resposta (KiB)":>14} {"limite (KiB)":>12}')
+        for path, query_params in REQUESTS:
+            event = {'path': path, 'queryStringParameters': query_params}
+            route = read_data.resolve_route(event, query_params)
+            timings = []
+            standin.reset()
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = read_data.handler(event, None)
+                timings.append(time.perf_counter() - started)
+                assert response['statusCode'] == 200, response
+            shown = '&'.join(f'{k}={v}' for k, v in query_params.items() if k != 'device_id')
+            label = f'{path}?{shown}' if shown else path
+            print(f'{label:<44} {statistics.median(timings) * 1000:>14.1f} {standin.queries / args.repeat:>9.1f}'
+                  f' {len(response["body"]) / 1024:>14.1f} {route.max_bytes / 1024:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
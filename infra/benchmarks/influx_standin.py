@@ -0,0 +1,114 @@
+# benchmarks/influx_standin.py
+#
+# Substituto local do InfluxDB para os benchmarks: aceita escritas em
+# /api/v2/write (contando linhas e bytes) sem persistir nada e responde
+# /api/v2/query com o CSV devolvido por ``query_responder(requisição JSON)``.
+
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class InfluxStandIn:
+    def __init__(self, latency_ms=0.0, handshake_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        # Atraso ao aceitar cada conexão nova, simulando o handshake TCP/TLS de uma rede real
+        self.handshake = handshake_ms / 1000.0
+        self.query_responder = None
+        # Com token definido, requisições com outro "Authorization: Token ..." recebem 401 (rotação de segredo)
+        self.token = None
+        self.lock = threading.Lock()
+        self.reset()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.lines = 0
+            self.bytes = 0
+            self.queries = 0
+            self.connections = 0
+            self.unauthorized = 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeçalhos e corpo saem em escritas separadas; sem isso o ACK atrasado do cliente soma ~40 ms por resposta
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                if standin.handshake:
+                    time.sleep(standin.handshake)
+                with standin.lock:
+                    standin.connections += 1
+                super().setup()
+
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                return body
+
+            def _reply(self, status, body=b'', content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/ping') or self.path.startswith('/health'):
+                    return self._reply(204)
+                return self._reply(404, b'{"code":"not found"}')
+
+            def do_POST(self):
+                body = self._read_body()
+                if standin.latency:
+                    time.sleep(standin.latency)
+                if standin.token is not None and self.headers.get('Authorization') != f'Token {standin.token}':
+                    with standin.lock:
+                        standin.unauthorized += 1
+                    return self._reply(401, b'{"code":"unauthorized","message":"unauthorized access"}')
+                if self.path.startswith('/api/v2/write'):
+                    with standin.lock:
+                        standin.requests += 1
+                        standin.lines += body.count(b'\n') + (1 if body and not body.endswith(b'\n') else 0)
+                        standin.bytes += len(body)
+                    return self._reply(204)
+                if self.path.startswith('/api/v2/query') and standin.query_responder is not None:
+                    with standin.lock:
+                        standin.queries += 1
+                    return self._reply(200, standin.query_responder(json.loads(body)), 'text/csv; charset=utf-8')
+                return self._reply(404, b'{"code":"not found"}')
+
+        return Handler
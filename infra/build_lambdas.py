@@ -0,0 +1,201 @@
+# infra/build_lambdas.py
+#
+# Monta o pacote de deploy de cada Lambda em infra/build/<lambda>/ a partir do
+# diretório com o código e as dependências vendorizadas (pip install -t):
+#   - copia os módulos de infra/shared/ (credenciais, pool e cliente do
+#     InfluxDB), mantidos em um só lugar e usados pelas duas Lambdas;
+#   - remove o que não roda na Lambda: setuptools, pkg_resources e
+#     _distutils_hack (trazidos como dependência de instalação do
+#     influxdb-client), __pycache__ locais e os clientes async (sem aiohttp);
+#   - troca os __init__.py do influxdb_client, que importam ~320 modelos e ~43
+#     serviços a cada cold start, por versões preguiçosas (PEP 562): cada nome
+#     só é importado no primeiro acesso;
+#   - com um Python da mesma versão do runtime, pré-compila os .pyc, que a
+#     Lambda não consegue gravar em /var/task (sem eles cada cold start compila
+#     de novo todos os módulos importados).
+#
+# O Terraform empacota infra/build/<lambda>; rode antes do "terraform apply":
+#   python infra/build_lambdas.py [--python python3.9]
+
+import argparse
+import ast
+import fnmatch
+import os
+import shutil
+import subprocess
+import sys
+
+INFRA_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(INFRA_DIR, 'build')
+SHARED_DIR = os.path.join(INFRA_DIR, 'shared')
+LAMBDAS = ('lambda_function', 'lambda_read_data')
+# Versão do runtime das Lambdas (lambda.tf); os .pyc só servem para a mesma versão
+RUNTIME = (3, 9)
+
+# Caminhos (relativos à raiz do pacote) que não vão para o deploy
+STRIP_PATHS = (
+    'setuptools', 'pkg_resources', '_distutils_hack', 'distutils-precedence.pth', 'requirements.txt',
+    'influxdb_client/_async',
+    'influxdb_client/client/influxdb_client_async.py',
+    'influxdb_client/client/query_api_async.py',
+    'influxdb_client/client/write_api_async.py',
+    'influxdb_client/client/delete_api_async.py',
+    'influxdb_client/client/util/multiprocessing_helper.py',
+)
+STRIP_PATTERNS = ('setuptools-*.dist-info',)
+LAZY_PACKAGE = 'influxdb_client'
+
+LAZY_INIT = '''"""{doc}
+
+Versão preguiçosa gerada por infra/build_lambdas.py: os nomes exportados só
+são importados no primeiro acesso (PEP 562).
+"""
+import importlib
+
+_EXPORTS = {{
+{exports}
+}}
+
+
+def __getattr__(name):
+    source = _EXPORTS.get(name)
+    if source is None:
+        raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+    value = getattr(importlib.import_module(source[0]), source[1])
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+'''
+
+
+def module_exists(root, module):
+    path = os.path.join(root, *module.split('.'))
+    return os.path.isfile(path + '.py') or os.path.isfile(os.path.join(path, '__init__.py'))
+
+
+def lazy_init(source, root):
+    """Texto do __init__ preguiçoso, ou ``None`` se o original faz mais do que reexportar nomes."""
+    tree = ast.parse(source)
+    exports = {}
+    for index, node in enumerate(tree.body):
+        if index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # docstring
+        if isinstance(node, ast.ImportFrom) and node.level == 0:
+            if node.module == '__future__':
+                continue
+            for alias in node.names:
+                exports[alias.asname or alias.name] = (node.module, alias.name)
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+              and isinstance(node.value, ast.Name) and node.value.id in exports):
+            exports[node.targets[0].id] = exports[node.value.id]  # __version__ = VERSION
+        else:
+            return None
+    if not exports:
+        return None
+    lines = [f'    {name!r}: {value!r},' for name, value in exports.items() if module_exists(root, value[0])]
+    doc = (ast.get_docstring(tree) or '').replace('\\', '\\\\').replace('"""', "'''")
+    return LAZY_INIT.format(doc=doc, exports='\n'.join(lines))
+
+
+def copy_shared(root):
+    copied = 0
+    for name in sorted(os.listdir(SHARED_DIR)):
+        if not name.endswith('.py'):
+            continue
+        if os.path.exists(os.path.join(root, name)):
+            raise SystemExit(f'{name} existe em infra/shared e no diretório da Lambda')
+        shutil.copy2(os.path.join(SHARED_DIR, name), root)
+        copied += 1
+    return copied
+
+
+def strip(root):
+    removed = 0
+    for relative in STRIP_PATHS:
+        path = os.path.join(root, *relative.split('/'))
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            removed += 1
+        elif os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    for directory, dirnames, filenames in os.walk(root):
+        for name in [name for name in dirnames if any(fnmatch.fnmatch(name, p) for p in STRIP_PATTERNS)]:
+            shutil.rmtree(os.path.join(directory, name))
+            dirnames.remove(name)
+            removed += 1
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, p) for p in STRIP_PATTERNS):
+                os.remove(os.path.join(directory, name))
+                removed += 1
+    return removed
+
+
+def make_lazy(root):
+    rewritten = 0
+    for directory, _, filenames in os.walk(os.path.join(root, LAZY_PACKAGE)):
+        if '__init__.py' not in filenames:
+            continue
+        path = os.path.join(directory, '__init__.py')
+        with open(path, encoding='utf-8') as f:
+            text = lazy_init(f.read(), root)
+        if text is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            rewritten += 1
+    return rewritten
+
+
+def precompile(root, python):
+    version = subprocess.run([python, '-c', 'import sys; print(*sys.version_info[:2])'],
+                             capture_output=True, text=True, check=True).stdout.split()
+    if tuple(map(int, version)) != RUNTIME:
+        print(f'  .pyc não gerados: {python} é {".".join(version)}, o runtime é {".".join(map(str, RUNTIME))}')
+        return False
+    # unchecked-hash: o .pyc vale independente do mtime (que o zip não preserva com precisão)
+    subprocess.run([python, '-m', 'compileall', '-q', '-j', '0', '--invalidation-mode', 'unchecked-hash', root],
+                   check=True)
+    return True
+
+
+def tree_size(root, skip=()):
+    files = size = 0
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if name not in skip]
+        for name in filenames:
+            files += 1
+            size += os.path.getsize(os.path.join(directory, name))
+    return files, size
+
+
+def build(name, python):
+    source = os.path.join(INFRA_DIR, name)
+    target = os.path.join(BUILD_DIR, name)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    shutil.copytree(source, target, ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+    shared = copy_shared(target)
+    removed = strip(target)
+    rewritten = make_lazy(target)
+    compiled = precompile(target, python)
+    before, after = tree_size(source, skip=('__pycache__',)), tree_size(target)
+    print(f'{name}: {shared} módulos compartilhados, {removed} itens removidos, {rewritten} __init__ preguiçosos, .pyc {"sim" if compiled else "não"};'
+          f' {before[0]} -> {after[0]} arquivos, {before[1] / 2 ** 20:.1f} -> {after[1] / 2 ** 20:.1f} MiB')
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--python', default=sys.executable,
+                        help=f'interpretador {".".join(map(str, RUNTIME))} usado para gerar os .pyc')
+    parser.add_argument('lambdas', nargs='*', default=list(LAMBDAS))
+    args = parser.parse_args()
+    for name in args.lambdas:
+        build(name, args.python)
+
+
+if __name__ == '__main__':
+    main()
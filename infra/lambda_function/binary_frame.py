@@ -0,0 +1,247 @@
+# lambda_function/binary_frame.py
+#
+# Formato binário compacto para uploads do ESP32. Um corpo pode conter
+# vários frames concatenados (um por dispositivo/janela). Todos os campos
+# são little-endian:
+#
+#   magic        2s   b'WS'
+#   version      B    1
+#   encoding     B    0 = float32, 1 = int16 escalado, 2 = delta zigzag varint (int16 escalado)
+#   device_len   B    seguido de device_len bytes UTF-8 do device id
+#   base_ts      q    timestamp da primeira amostra, epoch ms
+#   interval_us  I    intervalo entre amostras em microssegundos
+#   scale        f    valor = inteiro * scale (ignorado em float32)
+#   count        I    número de amostras
+#   samples           count * 4 bytes (float32), count * 2 bytes (int16) ou varints
+#   crc32        I    zlib.crc32 de tudo que vem antes no frame
+#
+# As amostras são lidas direto do buffer com array/memoryview e expandidas em
+# line protocol sem criar objetos Point.
+
+import math
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import accumulate
+from readings import (InvalidPayload, MEASUREMENT, MAX_BATCH_SIZE, PRECISION_FACTORS,
+                      MAX_PAST_SECONDS, MAX_FUTURE_SECONDS)
+
+MAGIC = b'WS'
+VERSION = 1
+ENCODING_FLOAT32 = 0
+ENCODING_INT16 = 1
+ENCODING_DELTA_VARINT = 2
+
+_PREFIX = struct.Struct('<2sBBB')
+_TIMING = struct.Struct('<qIfI')
+_CRC = struct.Struct('<I')
+_DEVICE = re.compile(rb'[^\s,=\\"]+')
+_SWAP = sys.byteorder != 'little'
+
+
+class Frame:
+    __slots__ = ('device', 'base_ts', 'interval_us', 'scale', 'encoding', 'count', 'samples', '_values')
+
+    def __init__(self, device, base_ts, interval_us, scale, encoding, count, samples):
+        self.device = device
+        self.base_ts = base_ts
+        self.interval_us = interval_us
+        self.scale = scale
+        self.encoding = encoding
+        self.count = count
+        self.samples = samples
+        self._values = None
+
+    def values(self):
+        """Amostras em unidades físicas (A), decodificadas uma única vez."""
+        if self._values is None:
+            if self.encoding == ENCODING_FLOAT32:
+                self._values = _typed(self.samples, 'f')
+            else:
+                ints = (_typed(self.samples, 'h') if self.encoding == ENCODING_INT16
+                        else _decode_deltas(self.samples, self.count))
+                scale = self.scale
+                self._values = [value * scale for value in ints]
+        return self._values
+
+    def start_ns(self):
+        return self.base_ts * 10 ** 6
+
+    def step_ns(self):
+        return self.interval_us * 10 ** 3
+
+
+def _typed(view, typecode):
+    values = array(typecode)
+    values.frombytes(view)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _decode_deltas(view, count):
+    deltas = []
+    append = deltas.append
+    value = shift = 0
+    for byte in view:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+    if len(deltas) != count or shift:
+        raise InvalidPayload('Frame binário com amostras delta corrompidas')
+    return accumulate(deltas)
+
+
+def _varint_size(view, count):
+    # Tamanho em bytes das ``count`` primeiras varints de ``view``
+    seen = 0
+    for index, byte in enumerate(view):
+        if not byte & 0x80:
+            seen += 1
+            if seen == count:
+                return index + 1
+    raise InvalidPayload('Frame binário truncado')
+
+
+# --- Decodificação ---
+def parse_frames(data):
+    """Separa o corpo em frames validados (magic, versão, CRC, device id, intervalo e amostras finitas)."""
+    view = memoryview(data)
+    frames = []
+    total = 0
+    pos = 0
+    while pos < len(view):
+        start = pos
+        try:
+            magic, version, encoding, device_len = _PREFIX.unpack_from(view, pos)
+            pos += _PREFIX.size
+            device = bytes(view[pos:pos + device_len])
+            pos += device_len
+            base_ts, interval_us, scale, count = _TIMING.unpack_from(view, pos)
+            pos += _TIMING.size
+        except struct.error:
+            raise InvalidPayload('Frame binário truncado') from None
+        if magic != MAGIC:
+            raise InvalidPayload('Frame binário sem o marcador "WS"')
+        if version != VERSION:
+            raise InvalidPayload(f'Versão de frame não suportada: {version}')
+        try:
+            device = device.decode() if _DEVICE.fullmatch(device) else None
+        except UnicodeDecodeError:
+            device = None
+        if device is None:
+            raise InvalidPayload('Frame binário com device id inválido')
+
+        if encoding == ENCODING_FLOAT32:
+            size = count * 4
+        elif encoding == ENCODING_INT16:
+            size = count * 2
+        elif encoding == ENCODING_DELTA_VARINT:
+            size = _varint_size(view[pos:len(view) - _CRC.size], count) if count else 0
+        else:
+            raise InvalidPayload(f'Codificação de frame desconhecida: {encoding}')
+        samples = view[pos:pos + size]
+        pos += size
+        if len(samples) != size or pos + _CRC.size > len(view):
+            raise InvalidPayload('Frame binário truncado')
+        (crc,) = _CRC.unpack_from(view, pos)
+        if zlib.crc32(view[start:pos]) != crc:
+            raise InvalidPayload('Frame binário com CRC inválido')
+        pos += _CRC.size
+
+        total += count
+        if total > MAX_BATCH_SIZE:
+            raise InvalidPayload(f'Lote excede o limite de {MAX_BATCH_SIZE} leituras')
+        # Amostras com o mesmo timestamp se sobrescrevem no InfluxDB
+        if interval_us == 0 and count > 1:
+            raise InvalidPayload(f'Frame {len(frames)}: intervalo zero com mais de uma amostra')
+        if not math.isfinite(scale):
+            raise InvalidPayload(f'Frame {len(frames)}: escala deve ser um número finito')
+        frame = Frame(device, base_ts, interval_us, scale, encoding, count, samples)
+        # NaN/Inf não existem em line protocol: o InfluxDB recusaria o lote inteiro
+        if not all(map(math.isfinite, frame.values())):
+            raise InvalidPayload(f'Frame {len(frames)}: amostras devem ser números finitos')
+        frames.append(frame)
+    if not total:
+        raise InvalidPayload('Nenhuma leitura enviada')
+    return frames
+
+
+def frames_precision(frames):
+    """Precisão mais grossa que representa todos os timestamps dos frames."""
+    return 'ms' if all(frame.interval_us % 1000 == 0 for frame in frames) else 'us'
+
+
+def frames_to_line_protocol(frames, precision):
+    """Expande os frames em bytes de line protocol; retorna ``(payload, leituras)``."""
+    factor = PRECISION_FACTORS[precision]
+    now = int(time.time())
+    lower, upper = (now - MAX_PAST_SECONDS) * factor, (now + MAX_FUTURE_SECONDS) * factor
+    chunks = []
+    count = 0
+    for frame in frames:
+        if not frame.count:
+            continue
+        start = frame.base_ts * factor // 1000
+        step = frame.interval_us * factor // 10 ** 6
+        if not (lower <= start and start + step * (frame.count - 1) <= upper):
+            raise InvalidPayload(f'Timestamps do frame de "{frame.device}" fora da janela aceita')
+        template = f'{MEASUREMENT},device={frame.device} current=%.7g %d'
+        timestamps = range(start, start + step * frame.count, step) if step else [start]
+        chunks.append('\n'.join(map(template.__mod__, zip(frame.values(), timestamps))))
+        count += frame.count
+    return '\n'.join(chunks).encode(), count
+
+
+def decode(data):
+    """Decodifica um corpo binário; retorna ``(payload de line protocol, precisão, leituras, frames)``."""
+    frames = parse_frames(data)
+    precision = frames_precision(frames)
+    payload, count = frames_to_line_protocol(frames, precision)
+    return payload, precision, count, frames
+
+
+# --- Codificador de referência (testes e firmware) ---
+def encode_frame(device_id, base_ts, interval_us, samples, encoding=ENCODING_FLOAT32, scale=0.001):
+    """Monta um frame a partir de amostras em A; inteiros são ``round(amostra / scale)``."""
+    device = device_id.encode()
+    if encoding == ENCODING_FLOAT32:
+        body = array('f', samples)
+        if _SWAP:
+            body.byteswap()
+        body = body.tobytes()
+    else:
+        ints = [round(sample / scale) for sample in samples]
+        if any(not -32768 <= value <= 32767 for value in ints):
+            raise ValueError('Amostra fora da faixa int16 para a escala escolhida')
+        if encoding == ENCODING_INT16:
+            body = array('h', ints)
+            if _SWAP:
+                body.byteswap()
+            body = body.tobytes()
+        elif encoding == ENCODING_DELTA_VARINT:
+            out = bytearray()
+            previous = 0
+            for value in ints:
+                delta = _zigzag(value - previous)
+                previous = value
+                while delta >= 0x80:
+                    out.append((delta & 0x7F) | 0x80)
+                    delta >>= 7
+                out.append(delta)
+            body = bytes(out)
+        else:
+            raise ValueError(f'Codificação desconhecida: {encoding}')
+    frame = (_PREFIX.pack(MAGIC, VERSION, encoding, len(device)) + device
+             + _TIMING.pack(base_ts, interval_us, scale, len(samples)) + body)
+    return frame + _CRC.pack(zlib.crc32(frame))
@@ -0,0 +1,141 @@
+# lambda_function/dedup.py
+#
+# Deduplicação de lotes reenviados pelos dispositivos. Cada lote aceito é
+# registrado pela sua chave (Idempotency-Key ou device + número de
+# sequência) em um LRU em memória, exato, e em um filtro de Bloom em disco,
+# compacto, que cobre uma janela muito maior de lotes recentes.
+#
+# O filtro de Bloom tem duas gerações: quando a atual atinge a capacidade,
+# a mais antiga é zerada e passa a receber as novas chaves, então a memória
+# de lotes recentes fica entre 1x e 2x DEDUP_BLOOM_CAPACITY.
+#
+# Para a confirmação de um reenvio ter o mesmo formato da primeira resposta,
+# lotes no formato legado (uma leitura, resposta só com a mensagem) são
+# registrados com a marca "single": no LRU como valor da chave, no filtro
+# como uma segunda chave derivada.
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+# --- Configuração ---
+DEDUP_DIR = os.environ.get('DEDUP_DIR', '/tmp/wiresense-dedup')
+LRU_SIZE = int(os.environ.get('DEDUP_LRU_SIZE', '10000'))
+BLOOM_CAPACITY = int(os.environ.get('DEDUP_BLOOM_CAPACITY', '100000'))
+BLOOM_ERROR_RATE = float(os.environ.get('DEDUP_BLOOM_ERROR_RATE', '1e-6'))
+
+_HEADER = struct.Struct('<QQ')  # chaves inseridas, geração
+_SINGLE_MARK = b'#single'
+
+
+class BloomFilter:
+    """Filtro de Bloom persistido em um arquivo mapeado em memória."""
+
+    def __init__(self, path, capacity, error_rate):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        size = _HEADER.size + (self.bits + 7) // 8
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    @property
+    def count(self):
+        return _HEADER.unpack_from(self.map, 0)[0]
+
+    @property
+    def generation(self):
+        return _HEADER.unpack_from(self.map, 0)[1]
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        data = self.map
+        offset = _HEADER.size
+        return all(data[offset + bit // 8] & (1 << (bit % 8)) for bit in self._positions(key))
+
+    def add(self, key):
+        data = self.map
+        offset = _HEADER.size
+        for bit in self._positions(key):
+            data[offset + bit // 8] |= 1 << (bit % 8)
+        _HEADER.pack_into(data, 0, self.count + 1, self.generation)
+
+    def reset(self, generation):
+        self.map[:] = bytes(len(self.map))
+        _HEADER.pack_into(self.map, 0, 0, generation)
+
+
+class Deduplicator:
+    def __init__(self, directory=DEDUP_DIR, lru_size=LRU_SIZE, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+        self.capacity = capacity
+        self.stats = {'lru_hits': 0, 'bloom_hits': 0, 'misses': 0, 'recorded': 0}
+        self.blooms = []
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.blooms = [BloomFilter(os.path.join(directory, f'bloom-{name}.bin'), capacity, error_rate)
+                           for name in ('a', 'b')]
+            self.blooms.sort(key=lambda bloom: bloom.generation, reverse=True)
+        except OSError as e:
+            # Sem disco gravável a deduplicação continua só com o LRU
+            print(f"Dedup: filtro em disco indisponível, usando só memória: {e}")
+
+    def seen(self, key):
+        key = key.encode()
+        if key in self.lru:
+            self.lru.move_to_end(key)
+            self.stats['lru_hits'] += 1
+            return True
+        if any(key in bloom for bloom in self.blooms):
+            self.stats['bloom_hits'] += 1
+            return True
+        self.stats['misses'] += 1
+        return False
+
+    def is_single(self, key):
+        """Se o lote já visto de ``key`` foi registrado no formato legado (uma leitura)."""
+        key = key.encode()
+        if key in self.lru:
+            return self.lru[key]
+        return any(key + _SINGLE_MARK in bloom for bloom in self.blooms)
+
+    def record(self, key, single=False):
+        key = key.encode()
+        self.lru[key] = single
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+        if self.blooms:
+            current = self.blooms[0]
+            if current.count >= self.capacity:
+                oldest = self.blooms.pop()
+                oldest.reset(current.generation + 1)
+                self.blooms.insert(0, oldest)
+                current = oldest
+            current.add(key)
+            if single:
+                current.add(key + _SINGLE_MARK)
+        self.stats['recorded'] += 1
+
+
+def idempotency_key(header_key=None, body=None):
+    """Chave do lote: ``Idempotency-Key`` explícita ou ``device_id`` + ``seq`` do corpo JSON."""
+    if header_key:
+        return f'key:{header_key}'
+    if isinstance(body, dict) and body.get('seq') is not None and body.get('device_id'):
+        return f'seq:{body["device_id"]}:{body["seq"]}'
+    return None
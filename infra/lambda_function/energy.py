@@ -0,0 +1,175 @@
+# lambda_function/energy.py
+#
+# Integração de energia em streaming na ingestão. Cada ambiente da Lambda
+# mantém, por dispositivo, a última amostra de potência e acumuladores por
+# hora e por dia (regra do trapézio sobre os timestamps dos dispositivos).
+# Periodicamente os acumuladores alterados viram pontos "energia_integrada"
+# no bucket de longo prazo, e as consultas de resumo/histórico leem esses
+# poucos pontos em vez de varrer as leituras brutas.
+#
+# Vários ambientes podem receber dados do mesmo dispositivo, então cada um
+# grava o seu total parcial em um timestamp próprio (início do período +
+# deslocamento aleatório em ns). Regravar o mesmo timestamp só atualiza o
+# parcial deste ambiente, e o total do período é a soma dos parciais.
+# Para os parciais não se sobreporem quando lotes consecutivos caem em
+# ambientes diferentes, o intervalo entre a última amostra guardada e o
+# início de um lote só é integrado se couber em um passo de amostragem do
+# dispositivo; senão o lote anterior foi para outro ambiente e esse trecho
+# (um passo) fica sem integrar.
+
+import os
+import random
+import time
+from influxdb_client import Point
+from readings import WINDOW_SIZES
+
+# --- Configuração ---
+ENERGY_MEASUREMENT = "energia_integrada"
+NOMINAL_VOLTAGE = float(os.environ.get('NOMINAL_VOLTAGE', '220'))
+# Intervalos sem amostras maiores que isso não são integrados (dispositivo offline)
+MAX_GAP_SECONDS = float(os.environ.get('ENERGY_MAX_GAP_SECONDS', '60'))
+# Folga sobre o passo de amostragem para ligar um lote à amostra anterior (atraso/jitter do dispositivo)
+BRIDGE_TOLERANCE = 1.5
+FLUSH_INTERVAL = float(os.environ.get('ENERGY_FLUSH_INTERVAL', '60'))
+# Amostras mais antigas que isso não são integradas: o parcial do período já foi descartado da memória
+MAX_LAG_SECONDS = float(os.environ.get('ENERGY_MAX_LAG_SECONDS', str(2 * 24 * 3600)))
+# Fuso usado para definir o início do dia (ex.: -180 para o horário de Brasília)
+UTC_OFFSET_NS = int(os.environ.get('ENERGY_UTC_OFFSET_MINUTES', '0')) * 60 * 10 ** 9
+
+PERIODS = (('1h', 3600 * 10 ** 9), ('1d', 24 * 3600 * 10 ** 9))
+_NS_PER_HOUR = 3600 * 10 ** 9
+
+
+def reading_power(fields):
+    """Potência ativa (W) da leitura: ``power`` medido ou corrente x tensão (medida ou nominal)."""
+    if fields.get('power') is not None:
+        return fields['power']
+    if fields.get('current') is None:
+        return None
+    return fields['current'] * fields.get('voltage', NOMINAL_VOLTAGE)
+
+
+def period_start(timestamp, length):
+    return timestamp - (timestamp + UTC_OFFSET_NS) % length
+
+
+class EnergyAccumulator:
+    def __init__(self):
+        self.last_sample = {}  # device -> (timestamp ns, potência W)
+        self.sample_step = {}  # device -> menor intervalo (ns) visto dentro de um lote
+        self.totals = {}       # (device, período, início ns) -> Wh
+        self.dirty = set()
+        self.offset = random.randrange(1, 10 ** 6)
+        self.last_flush = time.monotonic()
+
+    def _accumulate(self, device, start, end, wh):
+        # Distribui a energia do intervalo [start, end] entre os períodos que ele cruza
+        for period, length in PERIODS:
+            if end <= start:
+                self._add(device, period, period_start(start, length), wh)
+                continue
+            cursor = start
+            while cursor < end:
+                bucket = period_start(cursor, length)
+                segment_end = min(end, bucket + length)
+                self._add(device, period, bucket, wh * (segment_end - cursor) / (end - start))
+                cursor = segment_end
+
+    def _add(self, device, period, start, wh):
+        key = (device, period, start)
+        self.totals[key] = self.totals.get(key, 0.0) + wh
+        self.dirty.add(key)
+
+    def _too_old(self, timestamp):
+        return timestamp < time.time_ns() - MAX_LAG_SECONDS * 10 ** 9
+
+    def _trapezoid(self, device, previous, sample):
+        elapsed = sample[0] - previous[0]
+        if 0 < elapsed <= MAX_GAP_SECONDS * 10 ** 9:
+            self._accumulate(device, previous[0], sample[0], (previous[1] + sample[1]) / 2 * elapsed / _NS_PER_HOUR)
+
+    def _bridges(self, device, previous, start):
+        # A amostra guardada só emenda no lote se for a imediatamente anterior (um passo antes)
+        step = self.sample_step.get(device)
+        return previous is not None and step is not None and start - previous[0] <= step * BRIDGE_TOLERANCE
+
+    def add_samples(self, device, samples):
+        """Integra pelo trapézio as amostras ``[(timestamp ns, potência W)]`` de um lote, em ordem."""
+        previous = self.last_sample.get(device)
+        samples = [(timestamp, power) for timestamp, power in samples
+                   if power is not None and not self._too_old(timestamp)
+                   and (previous is None or timestamp > previous[0])]  # fora de ordem ou repetidas
+        if not samples:
+            return
+        steps = [b[0] - a[0] for a, b in zip(samples, samples[1:]) if b[0] > a[0]]
+        if steps:
+            self.sample_step[device] = min(steps)
+        if self._bridges(device, previous, samples[0][0]):
+            self._trapezoid(device, previous, samples[0])
+        for a, b in zip(samples, samples[1:]):
+            self._trapezoid(device, a, b)
+        self.last_sample[device] = samples[-1]
+
+    def add_energy(self, device, start, end, wh, last_sample=None):
+        """Soma energia já conhecida do intervalo (janela agregada ou bloco de amostras)."""
+        if self._too_old(start):
+            return
+        self._accumulate(device, start, end, wh)
+        if last_sample is not None:
+            previous = self.last_sample.get(device)
+            if previous is None or last_sample[0] > previous[0]:
+                self.last_sample[device] = last_sample
+
+    def add_block(self, device, start, step, currents):
+        """Amostras de corrente igualmente espaçadas (frame binário), integradas com ``sum`` em C."""
+        count = len(currents)
+        previous = self.last_sample.get(device)
+        if not count or (previous is not None and start <= previous[0]):
+            return
+        if count > 1 and step > 0:
+            self.sample_step[device] = step
+        self.add_samples(device, [(start, currents[0] * NOMINAL_VOLTAGE)])
+        if count == 1 or not 0 < step <= MAX_GAP_SECONDS * 10 ** 9:
+            return
+        end = start + step * (count - 1)
+        trapezoid = sum(currents) - (currents[0] + currents[-1]) / 2
+        self.add_energy(device, start, end, trapezoid * NOMINAL_VOLTAGE * step / _NS_PER_HOUR,
+                        last_sample=(end, currents[-1] * NOMINAL_VOLTAGE))
+
+    def due(self):
+        return bool(self.dirty) and time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+
+    def drain(self):
+        """Pontos (precisão ns) dos acumuladores alterados desde o último flush."""
+        self.last_flush = time.monotonic()
+        points = [
+            Point(ENERGY_MEASUREMENT).tag("device", device).tag("period", period)
+            .field("kwh", self.totals[(device, period, start)] / 1000).time(start + self.offset, 'ns')
+            for device, period, start in sorted(self.dirty)
+        ]
+        self.dirty.clear()
+        horizon = time.time_ns() - MAX_LAG_SECONDS * 10 ** 9 - PERIODS[-1][1]
+        for key in [key for key in self.totals if key[2] < horizon]:
+            del self.totals[key]
+        return points
+
+
+# --- Alimentação a partir dos lotes validados ---
+def feed_records(accumulator, reading_records, window_records=()):
+    samples = {}
+    for device, fields, timestamp in sorted(reading_records, key=lambda record: record[2]):
+        samples.setdefault(device, []).append((timestamp, reading_power(fields)))
+    for device, device_samples in samples.items():
+        accumulator.add_samples(device, device_samples)
+    for device, window_name, fields, start in window_records:
+        end = start + WINDOW_SIZES[window_name] * 10 ** 6
+        if fields.get('energy_wh') is not None:
+            wh = fields['energy_wh']
+        else:
+            wh = fields['current_mean'] * NOMINAL_VOLTAGE * (end - start) / _NS_PER_HOUR
+        accumulator.add_energy(device, start, end, wh)
+
+
+def feed_frames(accumulator, frames):
+    for frame in frames:
+        accumulator.add_block(frame.device, frame.start_ns(), frame.step_ns(), frame.values())
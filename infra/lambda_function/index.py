@@ -2,56 +2,252 @@
 
 import os
 import json
-import boto3
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+import base64
+import time
+import binary_frame
+import credentials
+import dedup
+import energy
+import influx_pool
+import line_protocol
+import peaks
+import spool
+from influxdb_client.rest import ApiException
+from readings import (InvalidPayload, extract_readings, extract_windows, validate, to_points,
+                      WRITE_PRECISION, PRECISION_FACTORS)
 
 # --- Configuração inicial ---
-secrets_manager = boto3.client('secretsmanager')
 influx_url = os.environ['INFLUXDB_URL']
-secret_arn = os.environ['SECRET_ARN']
-cached_secret = None
+credential_cache = credentials.CredentialCache()
+deduplicator = dedup.Deduplicator()
+energy_accumulator = energy.EnergyAccumulator()
+peak_accumulator = peaks.PeakAccumulator()
 
 # --- Função para obter credenciais do InfluxDB ---
 def get_influx_credentials():
-    global cached_secret
-    if cached_secret:
-        return cached_secret
+    return credential_cache.get()
+
+# --- Escrita no InfluxDB ---
+# Status do InfluxDB que indicam indisponibilidade temporária: os dados vão para o spool
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    if isinstance(error, influx_pool.CONNECTION_ERRORS):
+        return True
+    return isinstance(error, ApiException) and error.status in RETRYABLE_STATUS
+
+
+def write_line_protocol(creds, bucket, precision, payload):
+    def write(creds):
+        def send(client):
+            influx_pool.write_api_for(client).write(
+                bucket=bucket, org=creds['org'], record=payload, write_precision=precision)
+
+        influx_pool.call_with_retry(influx_url, creds['token'], creds['org'], send)
+
+    # Token rotacionado: um 401 busca o segredo de novo e repete a escrita
+    credential_cache.call(write, creds)
+
+
+def replay_spool(creds):
+    # Escrita voltou a funcionar: reenvia o que ficou no spool em lotes grandes
+    try:
+        sent = spool.replay(lambda bucket, precision, payload: write_line_protocol(creds, bucket, precision, payload),
+                            is_retryable=is_retryable)
+        if sent:
+            print(f"Spool: {sent} bytes reenviados {spool.stats()}")
+    except Exception as e:
+        print(f"Erro ao reenviar spool: {e}")
+
+
+def flush_rollups(creds):
+    # Totais parciais de energia (hora/dia) e picos diários vão para o bucket de longo prazo, lido por summary/history
+    points = energy_accumulator.drain() + peak_accumulator.drain()
+    if not points:
+        return
+    bucket = f"{creds['bucket']}_longterm"
+    payload = '\n'.join(point.to_line_protocol() for point in points).encode()
     try:
-        response = secrets_manager.get_secret_value(SecretId=secret_arn)
-        secret_data = json.loads(response['SecretString'])
-        cached_secret = {
-            'token': secret_data['INFLUXDB_INIT_ADMIN_TOKEN'],
-            'org': secret_data['INFLUXDB_ORG'],
-            'bucket': secret_data['INFLUXDB_BUCKET']
-        }
-        return cached_secret
+        write_line_protocol(creds, bucket, 'ns', payload)
     except Exception as e:
-        print(f"Erro ao buscar segredo do Secrets Manager: {e}")
-        raise e
+        if not is_retryable(e):
+            print(f"Erro ao gravar energia integrada e picos: {e}")
+            return
+        spool.append(bucket, 'ns', payload)
+
+
+# --- Leitura do payload (formato negociado pelo Content-Type) ---
+LINE_PROTOCOL_TYPES = {'text/plain', 'application/vnd.influx.line-protocol'}
+CSV_TYPES = {'text/csv'}
+FRAME_TYPES = {'application/vnd.wiresense.frame', 'application/octet-stream'}
+
+
+def get_header(event, name):
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def get_body_bytes(event):
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    return body.encode() if isinstance(body, str) else body
+
+
+def get_precision(event):
+    precision = (event.get('queryStringParameters') or {}).get('precision', WRITE_PRECISION)
+    if precision not in PRECISION_FACTORS:
+        raise InvalidPayload(f'Precisão inválida. Use uma de: {", ".join(PRECISION_FACTORS)}')
+    return precision
+
+
+class IngestBatch:
+    """Corpo já validado: payload de line protocol pronto e metadados para o handler."""
+
+    def __init__(self, payload, precision, count, is_batch=True, sequence_key=None, feed_rollups=None):
+        self.payload = payload
+        self.precision = precision
+        self.count = count
+        self.is_batch = is_batch
+        self.sequence_key = sequence_key
+        self.feed_rollups = feed_rollups  # alimenta os acumuladores de energia e de picos após a gravação
+
+
+def parse_request(event):
+    content_type = (get_header(event, 'content-type') or 'application/json').split(';')[0].strip().lower()
+
+    # Line protocol e CSV seguem direto como bytes e não passam pela integração de energia nem pelos picos
+    if content_type in LINE_PROTOCOL_TYPES:
+        precision = get_precision(event)
+        data = get_body_bytes(event)
+        return IngestBatch(data, precision, line_protocol.scan(data, precision))
+
+    if content_type in CSV_TYPES:
+        precision = get_precision(event)
+        payload, count = line_protocol.csv_to_line_protocol(get_body_bytes(event), precision)
+        return IngestBatch(payload, precision, count)
+
+    if content_type in FRAME_TYPES:
+        payload, precision, count, frames = binary_frame.decode(get_body_bytes(event))
+
+        def feed_frames():
+            energy.feed_frames(energy_accumulator, frames)
+            peaks.feed_frames(peak_accumulator, frames)
+        return IngestBatch(payload, precision, count, feed_rollups=feed_frames)
+
+    body = json.loads(get_body_bytes(event) or b'{}')
+    readings, default_device, is_batch = extract_readings(body)
+    windows = extract_windows(body)
+    # "precision" opcional no corpo fixa a unidade dos timestamps numéricos (senão deduzida pela magnitude)
+    unit = body.get('precision') if isinstance(body, dict) else None
+    try:
+        reading_records, window_records = validate(readings, default_device, windows, unit)
+    except InvalidPayload as e:
+        if is_batch:
+            raise
+        raise InvalidPayload(str(e)) from None  # formato legado: responde só a mensagem
+    points, precision = to_points(reading_records, window_records)
+    payload = '\n'.join(point.to_line_protocol() for point in points).encode()
+
+    def feed_records():
+        energy.feed_records(energy_accumulator, reading_records, window_records)
+        peaks.feed_records(peak_accumulator, reading_records, window_records)
+    return IngestBatch(payload, precision, len(points), is_batch, dedup.idempotency_key(body=body), feed_records)
+
+
+def duplicate_response(is_batch):
+    # Lote já gravado (ou no spool): confirma sem reescrever
+    if not is_batch:
+        return {'statusCode': 200, 'body': json.dumps('Dado já recebido')}
+    return {'statusCode': 200, 'body': json.dumps({'message': 'Lote já recebido', 'duplicate': True})}
+
 
 # --- Função principal da Lambda ---
 def handler(event, context):
     try:
+        # Chave explícita no cabeçalho: reenvios são confirmados antes mesmo de decodificar o corpo,
+        # no formato (lote ou leitura única) registrado com a chave na primeira vez
+        dedup_key = dedup.idempotency_key(get_header(event, 'idempotency-key'))
+        if dedup_key and deduplicator.seen(dedup_key):
+            return duplicate_response(not deduplicator.is_single(dedup_key))
+
+        try:
+            batch = parse_request(event)
+        except json.JSONDecodeError:
+            return {'statusCode': 400, 'body': json.dumps('Corpo da requisição não é um JSON válido')}
+        except InvalidPayload as e:
+            if e.errors:
+                return {'statusCode': 400, 'body': json.dumps({'error': str(e), 'details': e.errors})}
+            return {'statusCode': 400, 'body': json.dumps(str(e))}
+
+        is_batch, count = batch.is_batch, batch.count
+        if not dedup_key and batch.sequence_key:
+            dedup_key = batch.sequence_key
+            if deduplicator.seen(dedup_key):
+                return duplicate_response(is_batch)
+
         creds = get_influx_credentials()
-        client = InfluxDBClient(url=influx_url, token=creds['token'], org=creds['org'])
-        write_api = client.write_api(write_options=SYNCHRONOUS)
 
-        body = json.loads(event.get('body', '{}'))
-        device_id = body.get('device_id')
-        current_value = body.get('current')
+        # Todas as leituras vão em um único payload de line protocol
+        try:
+            write_line_protocol(creds, creds['bucket'], batch.precision, batch.payload)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            print(f"InfluxDB indisponível, gravando no spool: {e}")
+            spool.append(creds['bucket'], batch.precision, batch.payload)
+            if dedup_key:
+                deduplicator.record(dedup_key, single=not is_batch)
+            if batch.feed_rollups:
+                batch.feed_rollups()
+            if not is_batch:
+                return {'statusCode': 202, 'body': json.dumps('Dado armazenado para reenvio')}
+            return {'statusCode': 202, 'body': json.dumps({'message': 'Dados armazenados para reenvio', 'spooled': count})}
 
-        if not device_id or current_value is None:
-            return {
-                'statusCode': 400,
-                'body': json.dumps('Dados inválidos. Esperado: {"device_id": "...", "current": ...}')
-            }
+        if dedup_key:
+            deduplicator.record(dedup_key, single=not is_batch)
+        if batch.feed_rollups:
+            batch.feed_rollups()
+        if energy_accumulator.due() or peak_accumulator.due():
+            flush_rollups(creds)
 
-        point = Point("environment").tag("device", device_id).field("current", float(current_value))
-        write_api.write(bucket=creds['bucket'], org=creds['org'], record=point)
+        if spool.pending():
+            replay_spool(creds)
 
-        return {'statusCode': 200, 'body': json.dumps('Dado inserido com sucesso!')}
+        if not is_batch:
+            return {'statusCode': 200, 'body': json.dumps('Dado inserido com sucesso!')}
+        return {'statusCode': 200, 'body': json.dumps({'message': 'Dados inseridos com sucesso!', 'written': count})}
 
     except Exception as e:
         print(f"Erro no handler: {e}")
         return {'statusCode': 500, 'body': json.dumps(f'Erro interno: {str(e)}')}
+
+
+# --- Bootstrap na fase de init ---
+# Na carga do módulo (init do ambiente da Lambda, antes da primeira invocação) já busca as
+# credenciais, resolve o DNS do InfluxDB e abre a conexão do pool, para a primeira requisição
+# custar o mesmo que as seguintes. Se algo falhar, a requisição refaz o caminho normalmente.
+BOOTSTRAP_ON_INIT = os.environ.get('BOOTSTRAP_ON_INIT', '1') == '1'
+BOOTSTRAP_TIMEOUT_MS = int(os.environ.get('BOOTSTRAP_TIMEOUT_MS', '3000'))
+
+
+def bootstrap():
+    started = time.perf_counter()
+    try:
+        creds = get_influx_credentials()
+        secret_ms = round((time.perf_counter() - started) * 1000, 1)
+        timings = influx_pool.warm_up(influx_url, creds['token'], creds['org'],
+                                      influx_pool.write_api_for, BOOTSTRAP_TIMEOUT_MS)
+    except Exception as e:
+        print(f"Bootstrap: falhou, a primeira requisição conecta ({e})")
+        return None
+    timings = dict(secret_ms=secret_ms, **timings)
+    print(f"Bootstrap: pronto em {(time.perf_counter() - started) * 1000:.0f} ms {timings}")
+    return timings
+
+
+if BOOTSTRAP_ON_INIT:
+    bootstrap()
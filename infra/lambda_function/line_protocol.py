@@ -0,0 +1,164 @@
+# lambda_function/line_protocol.py
+#
+# Caminho rápido de ingestão: o dispositivo envia line protocol pronto (ou um
+# CSV compacto) e o payload é validado por um scanner de uma passada sobre os
+# bytes, sem json.loads e sem montar objetos Point. O line protocol aceito é
+# repassado byte a byte para o WriteApi.
+#
+# Linhas sem timestamp recebem o horário de chegada no InfluxDB, o mesmo para
+# todo o payload; como no JSON, só uma por dispositivo é aceita (duas
+# colidiriam no mesmo ponto e uma sobrescreveria a outra).
+
+import re
+import time
+from readings import (InvalidPayload, MEASUREMENT, TAG_KEYS, FIELD_KEYS, MAX_BATCH_SIZE,
+                      MAX_REPORTED_ERRORS, PRECISION_FACTORS, MAX_PAST_SECONDS, MAX_FUTURE_SECONDS)
+
+# Subconjunto estrito do line protocol: sem escapes, sem aspas e apenas campos float
+_VALUE = rb'[^\s,=\\"]+'
+_FLOAT = rb'-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+
+def _alternatives(names):
+    return b'|'.join(re.escape(name.encode()) for name in names)
+
+
+_LINE = re.compile(
+    rb'(?:' + _alternatives([MEASUREMENT]) + rb')'
+    rb'(?=[^ \n]*,device=(' + _VALUE + rb'))'
+    rb'(?:,(?:' + _alternatives(TAG_KEYS) + rb')=' + _VALUE + rb')+'
+    rb' (?:' + _alternatives(FIELD_KEYS) + rb')=' + _FLOAT +
+    rb'(?:,(?:' + _alternatives(FIELD_KEYS) + rb')=' + _FLOAT + rb')*'
+    rb'(?: (-?\d{1,19}))?'
+    rb'\r?(?=\n|$)'
+)
+_DEVICE = re.compile(_VALUE)
+_NUMBER = re.compile(_FLOAT)
+_TIMESTAMP = re.compile(rb'-?\d{1,19}')
+UNTIMED_DUPLICATE = 'Timestamp obrigatório para várias linhas do mesmo dispositivo'
+
+
+def _timestamp_bounds(precision):
+    factor = PRECISION_FACTORS[precision]
+    now = int(time.time())
+    return (now - MAX_PAST_SECONDS) * factor, (now + MAX_FUTURE_SECONDS) * factor
+
+
+def _check_limits(count, errors):
+    if errors:
+        raise InvalidPayload('Line protocol inválido', errors)
+    if count == 0:
+        raise InvalidPayload('Nenhuma leitura enviada')
+    if count > MAX_BATCH_SIZE:
+        raise InvalidPayload(f'Lote excede o limite de {MAX_BATCH_SIZE} leituras')
+
+
+def scan(data, precision):
+    """Valida ``data`` (bytes de line protocol) em uma passada e retorna o número de linhas.
+
+    Cada linha precisa usar a measurement, tags e campos permitidos, campos
+    float e timestamp (opcional, no máximo uma linha sem ele por dispositivo)
+    dentro da janela aceita na ``precision`` dada.
+    """
+    lower, upper = _timestamp_bounds(precision)
+    match = _LINE.match
+    size = len(data)
+    pos = 0
+    line_number = 0
+    count = 0
+    errors = []
+    untimed_devices = set()
+    while pos < size:
+        line_number += 1
+        end = data.find(b'\n', pos)
+        if end == -1:
+            end = size
+        if end == pos or data[pos] == 35:  # linha vazia ou comentário ('#')
+            pos = end + 1
+            continue
+        m = match(data, pos, end)
+        if m is None or m.end() < end:
+            errors.append({'line': line_number, 'error': 'Linha fora do formato aceito'})
+        elif m.group(2) is not None and not lower <= int(m.group(2)) <= upper:
+            errors.append({'line': line_number, 'error': 'Timestamp fora da janela aceita'})
+        elif m.group(2) is None and m.group(1) in untimed_devices:
+            errors.append({'line': line_number, 'error': UNTIMED_DUPLICATE})
+        else:
+            if m.group(2) is None:
+                untimed_devices.add(m.group(1))
+            count += 1
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            break
+        pos = end + 1
+    _check_limits(count, errors)
+    return count
+
+
+# --- CSV compacto ---
+# Cabeçalho opcional com os nomes das colunas; sem ele assume-se "device,timestamp,current".
+DEFAULT_CSV_COLUMNS = ('device', 'timestamp', 'current')
+
+
+def _csv_columns(header):
+    columns = tuple(name.strip() for name in header.decode().split(','))
+    if 'device' not in columns or any(c not in FIELD_KEYS + ('device', 'timestamp') for c in columns):
+        raise InvalidPayload(f'Cabeçalho CSV inválido; colunas aceitas: device, timestamp, {", ".join(FIELD_KEYS)}')
+    if not any(c in FIELD_KEYS for c in columns):
+        raise InvalidPayload('Cabeçalho CSV sem nenhum campo de medição')
+    return columns
+
+
+def csv_to_line_protocol(data, precision):
+    """Converte um CSV compacto diretamente em bytes de line protocol; retorna ``(payload, linhas)``."""
+    lines = data.splitlines()
+    columns = DEFAULT_CSV_COLUMNS
+    if lines and set(lines[0].decode(errors='replace').replace(' ', '').split(',')) & {'device', 'timestamp'}:
+        columns = _csv_columns(lines[0])
+        lines = lines[1:]
+    device_index = columns.index('device')
+    ts_index = columns.index('timestamp') if 'timestamp' in columns else None
+    fields = [(i, name.encode()) for i, name in enumerate(columns) if name in FIELD_KEYS]
+    prefix = MEASUREMENT.encode() + b',device='
+    lower, upper = _timestamp_bounds(precision)
+
+    out = []
+    errors = []
+    untimed_devices = set()
+    for line_number, line in enumerate(lines, start=1):
+        if not line:
+            continue
+        values = line.split(b',')
+        try:
+            if len(values) != len(columns):
+                raise ValueError('Número de colunas incorreto')
+            device = values[device_index]
+            if not _DEVICE.fullmatch(device):
+                raise ValueError('"device" inválido')
+            field_set = []
+            for index, name in fields:
+                value = values[index].strip()
+                if not _NUMBER.fullmatch(value):
+                    raise ValueError(f'"{name.decode()}" deve ser numérico')
+                field_set.append(name + b'=' + value)
+            record = prefix + device + b' ' + b','.join(field_set)
+            if ts_index is not None and values[ts_index]:
+                if not _TIMESTAMP.fullmatch(values[ts_index].strip()):
+                    raise ValueError('Timestamp inválido')
+                timestamp = int(values[ts_index])
+                if not lower <= timestamp <= upper:
+                    raise ValueError('Timestamp fora da janela aceita')
+                record += b' ' + values[ts_index].strip()
+            elif device in untimed_devices:
+                raise ValueError(UNTIMED_DUPLICATE)
+            else:
+                untimed_devices.add(device)
+        except ValueError as e:
+            errors.append({'line': line_number, 'error': str(e)})
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                break
+            continue
+        out.append(record)
+    if errors:
+        raise InvalidPayload('CSV inválido', errors)
+    _check_limits(len(out), errors)
+    return b'\n'.join(out), len(out)
@@ -0,0 +1,143 @@
+# lambda_function/peaks.py
+#
+# Rollup diário de picos de corrente na ingestão. Cada ambiente da Lambda
+# mantém, por dispositivo e dia, o máximo de corrente, o instante do máximo e
+# um histograma logarítmico das amostras. Os dias alterados viram pontos
+# "pico_diario" no bucket de longo prazo (junto com a energia integrada), e o
+# histórico de picos lê um ponto por dia em vez de varrer as leituras brutas.
+#
+# Como na energia, cada ambiente grava o seu parcial em um timestamp próprio
+# (início do dia + deslocamento aleatório em ns). Máximo e histograma se
+# combinam sem perda: o pico do dia é o maior dos parciais e o p95 sai da
+# soma dos histogramas.
+
+import math
+import random
+import time
+from collections import Counter
+from influxdb_client import Point
+from energy import FLUSH_INTERVAL, MAX_LAG_SECONDS, period_start
+
+# --- Configuração ---
+PEAK_MEASUREMENT = "pico_diario"
+_NS_PER_DAY = 24 * 3600 * 10 ** 9
+# Cada faixa do histograma é HISTOGRAM_GROWTH vezes a anterior: percentis com erro relativo de até 1%
+HISTOGRAM_GROWTH = 1.02
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+# Correntes abaixo disso (A) caem na primeira faixa
+MIN_CURRENT = 0.01
+
+
+def histogram_bin(current):
+    return math.floor(math.log(max(current, MIN_CURRENT)) / _LOG_GROWTH)
+
+
+class DailyPeak:
+    __slots__ = ('maximum', 'max_time', 'samples', 'bins')
+
+    def __init__(self):
+        self.maximum = None
+        self.max_time = None
+        self.samples = 0
+        self.bins = Counter()
+
+    def add_peak(self, current, timestamp):
+        if self.maximum is None or current > self.maximum:
+            self.maximum = current
+            self.max_time = timestamp
+
+    def encoded_bins(self):
+        # "faixa:contagem" separados por espaço; a Lambda de leitura soma os parciais
+        return ' '.join(f'{bin_}:{count}' for bin_, count in sorted(self.bins.items()))
+
+
+class PeakAccumulator:
+    def __init__(self):
+        self.days = {}  # (device, início do dia ns) -> DailyPeak
+        self.dirty = set()
+        self.offset = random.randrange(1, 10 ** 6)
+        self.last_flush = time.monotonic()
+
+    def _day(self, device, timestamp):
+        # Amostras mais antigas que ENERGY_MAX_LAG_SECONDS não entram: o dia já saiu da memória
+        if timestamp < time.time_ns() - MAX_LAG_SECONDS * 10 ** 9:
+            return None
+        key = (device, period_start(timestamp, _NS_PER_DAY))
+        self.dirty.add(key)
+        day = self.days.get(key)
+        if day is None:
+            day = self.days[key] = DailyPeak()
+        return day
+
+    def add_sample(self, device, timestamp, current, weight=1):
+        if current is None:
+            return
+        day = self._day(device, timestamp)
+        if day is None:
+            return
+        day.add_peak(current, timestamp)
+        day.bins[histogram_bin(current)] += weight
+        day.samples += weight
+
+    def add_window(self, device, start, fields):
+        """Janela agregada: o máximo é exato; a distribuição usa a média com o peso do número de amostras."""
+        day = self._day(device, start)
+        if day is None:
+            return
+        day.add_peak(fields['current_max'], start)
+        day.bins[histogram_bin(fields['current_mean'])] += fields['sample_count']
+        day.samples += fields['sample_count']
+
+    def add_block(self, device, start, step, currents):
+        """Amostras de corrente igualmente espaçadas (frame binário), separadas nas viradas de dia."""
+        index = 0
+        count = len(currents)
+        while index < count:
+            timestamp = start + step * index
+            day = self._day(device, timestamp)
+            if step > 0:
+                next_day = period_start(timestamp, _NS_PER_DAY) + _NS_PER_DAY
+                end = min(count, index + -(-(next_day - timestamp) // step))
+            else:
+                end = count
+            # float32 pode trazer NaN/Inf, que não têm faixa no histograma
+            segment = [value for value in currents[index:end] if math.isfinite(value)]
+            if day is not None and segment:
+                peak = max(segment)
+                day.add_peak(peak, start + step * (index + currents[index:end].index(peak)))
+                day.bins.update(map(histogram_bin, segment))
+                day.samples += len(segment)
+            index = end
+
+    def due(self):
+        return bool(self.dirty) and time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+
+    def drain(self):
+        """Pontos (precisão ns) dos dias alterados desde o último flush."""
+        self.last_flush = time.monotonic()
+        points = []
+        for device, start in sorted(self.dirty):
+            day = self.days[(device, start)]
+            points.append(
+                Point(PEAK_MEASUREMENT).tag("device", device).tag("period", "1d")
+                .field("current_max", float(day.maximum)).field("max_time", day.max_time // 10 ** 6)
+                .field("samples", day.samples).field("histogram", day.encoded_bins())
+                .time(start + self.offset, 'ns'))
+        self.dirty.clear()
+        horizon = time.time_ns() - MAX_LAG_SECONDS * 10 ** 9 - _NS_PER_DAY
+        for key in [key for key in self.days if key[1] < horizon]:
+            del self.days[key]
+        return points
+
+
+# --- Alimentação a partir dos lotes validados ---
+def feed_records(accumulator, reading_records, window_records=()):
+    for device, fields, timestamp in reading_records:
+        accumulator.add_sample(device, timestamp, fields.get('current'))
+    for device, window_name, fields, start in window_records:
+        accumulator.add_window(device, start, fields)
+
+
+def feed_frames(accumulator, frames):
+    for frame in frames:
+        accumulator.add_block(frame.device, frame.start_ns(), frame.step_ns(), frame.values())
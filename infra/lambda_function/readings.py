@@ -0,0 +1,260 @@
+# lambda_function/readings.py
+
+import calendar
+import math
+import os
+import re
+import time
+from decimal import Decimal
+from influxdb_client import Point, WritePrecision
+
+# --- Configuração ---
+MEASUREMENT = "environment"
+TAG_KEYS = ('device',)
+# Campos elétricos de uma leitura, gravados juntos no mesmo ponto:
+# corrente (A), tensão (V), potência ativa (W), aparente (VA), fator de potência
+# e contador de energia monotônico do medidor (Wh)
+FIELD_KEYS = ('current', 'voltage', 'power', 'apparent_power', 'power_factor', 'energy_total_wh')
+
+# Janelas pré-agregadas no dispositivo (min/max/média/rms por janela)
+WINDOW_MEASUREMENT = "environment_window"
+WINDOW_SIZES = {'1s': 1000, '5s': 5000, '10s': 10000, '30s': 30000, '1m': 60000, '5m': 300000, '15m': 900000, '1h': 3600000}
+WINDOW_DURATIONS = {duration_ms: name for name, duration_ms in WINDOW_SIZES.items()}
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '5000'))
+MAX_REPORTED_ERRORS = 20
+
+# Precisão padrão dos payloads de line protocol/CSV; lotes JSON escolhem a sua
+WRITE_PRECISION = WritePrecision.MS
+PRECISION_FACTORS = {'s': 1, 'ms': 10 ** 3, 'us': 10 ** 6, 'ns': 10 ** 9}
+
+# Janela aceita para timestamps dos dispositivos, relativa ao horário do servidor
+MAX_PAST_SECONDS = int(os.environ.get('MAX_PAST_SECONDS', str(30 * 24 * 3600)))
+MAX_FUTURE_SECONDS = int(os.environ.get('MAX_FUTURE_SECONDS', '300'))
+# "reject" recusa a leitura; "clamp" substitui o timestamp pelo horário de chegada
+CLOCK_SKEW_POLICY = os.environ.get('CLOCK_SKEW_POLICY', 'reject')
+
+
+class InvalidPayload(Exception):
+    """Corpo da requisição inválido; ``errors`` traz os detalhes por leitura."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+# --- Normalização do corpo ---
+def extract_readings(body):
+    """Aceita o formato legado (um objeto), uma lista de leituras ou ``{"readings": [...], "windows": [...]}``.
+
+    Retorna ``(leituras, device_padrao, is_batch)``.
+    """
+    if isinstance(body, list):
+        return body, None, True
+    if not isinstance(body, dict):
+        raise InvalidPayload('Corpo deve ser um objeto JSON ou uma lista de leituras')
+    if 'readings' in body or 'windows' in body:
+        readings = body.get('readings', [])
+        if not isinstance(readings, list):
+            raise InvalidPayload('"readings" deve ser uma lista')
+        return readings, body.get('device_id'), True
+    return [body], None, False
+
+
+def extract_windows(body):
+    windows = body.get('windows', []) if isinstance(body, dict) else []
+    if not isinstance(windows, list):
+        raise InvalidPayload('"windows" deve ser uma lista')
+    return windows
+
+
+# --- Validação de uma leitura ---
+def _parse_number(value, name):
+    if value is None or isinstance(value, bool):
+        raise ValueError(f'"{name}" ausente ou inválido')
+    number = float(value)
+    if math.isnan(number) or math.isinf(number):
+        raise ValueError(f'"{name}" deve ser um número finito')
+    return number
+
+
+def _parse_fields(reading):
+    fields = {}
+    for name in FIELD_KEYS:
+        if reading.get(name) is not None:
+            fields[name] = _parse_number(reading[name], name)
+    if not fields:
+        raise ValueError(f'Nenhum campo de medição; esperado ao menos um de: {", ".join(FIELD_KEYS)}')
+    if fields.get('power_factor', 0) < -1 or fields.get('power_factor', 0) > 1:
+        raise ValueError('"power_factor" deve estar entre -1 e 1')
+    for name in ('voltage', 'apparent_power', 'energy_total_wh'):
+        if fields.get(name, 0) < 0:
+            raise ValueError(f'"{name}" não pode ser negativo')
+    return fields
+
+
+_RFC3339 = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[Tt ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,9}))?(?:([Zz])|([+-])(\d{2}):(\d{2}))')
+# Unidade do epoch numérico deduzida pela magnitude (segundos até o ano 5138, depois ms, us, ns)
+_EPOCH_UNITS = ((10 ** 11, 's'), (10 ** 14, 'ms'), (10 ** 17, 'us'))
+
+
+def parse_timestamp(value, unit=None):
+    """Converte epoch (s/ms/us/ns) ou RFC3339 em nanossegundos inteiros, sem perder precisão."""
+    if isinstance(value, str):
+        m = _RFC3339.fullmatch(value.strip())
+        if not m:
+            raise ValueError('"timestamp" RFC3339 inválido')
+        year, month, day, hour, minute, second = (int(part) for part in m.group(1, 2, 3, 4, 5, 6))
+        seconds = calendar.timegm((year, month, day, hour, minute, second))
+        if m.group(9):
+            offset = (int(m.group(10)) * 60 + int(m.group(11))) * 60
+            seconds -= offset if m.group(9) == '+' else -offset
+        fraction = (m.group(7) or '').ljust(9, '0')
+        return seconds * 10 ** 9 + int(fraction)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('"timestamp" deve ser epoch (s, ms, us ou ns) ou RFC3339')
+    if value <= 0 or (isinstance(value, float) and not math.isfinite(value)):
+        raise ValueError('"timestamp" deve ser positivo')
+    if unit is None:
+        unit = next((name for limit, name in _EPOCH_UNITS if value < limit), 'ns')
+    elif unit not in PRECISION_FACTORS:
+        raise ValueError(f'"precision" deve ser uma de: {", ".join(PRECISION_FACTORS)}')
+    # Decimal a partir do repr evita o erro binário de floats como 1700000000.123
+    return int(Decimal(repr(value)) * (10 ** 9 // PRECISION_FACTORS[unit]))
+
+
+def choose_precision(timestamps):
+    """Precisão mais grossa em que todos os timestamps (ns) são exatos."""
+    for precision in ('s', 'ms', 'us'):
+        divisor = 10 ** 9 // PRECISION_FACTORS[precision]
+        if all(timestamp % divisor == 0 for timestamp in timestamps):
+            return precision
+    return 'ns'
+
+
+class _Clock:
+    """Janela aceita de timestamps e política para relógios fora dela (CLOCK_SKEW_POLICY)."""
+
+    def __init__(self):
+        now = time.time_ns()
+        # Horário de chegada truncado em ms, para não forçar precisão fina no lote
+        self.arrival = now - now % 10 ** 6
+        self.lower = now - MAX_PAST_SECONDS * 10 ** 9
+        self.upper = now + MAX_FUTURE_SECONDS * 10 ** 9
+
+    def check(self, timestamp):
+        if self.lower <= timestamp <= self.upper:
+            return timestamp
+        if CLOCK_SKEW_POLICY == 'clamp':
+            return self.arrival
+        raise ValueError('Timestamp fora da janela aceita (relógio do dispositivo dessincronizado?)')
+
+
+def _device(reading, default_device):
+    device_id = reading.get('device_id') or default_device
+    if not device_id or not isinstance(device_id, str):
+        raise ValueError('"device_id" ausente')
+    return device_id
+
+
+def _reading_record(reading, default_device, unit, clock, untimed_devices):
+    if not isinstance(reading, dict):
+        raise ValueError('Leitura deve ser um objeto')
+    device_id = _device(reading, default_device)
+    fields = _parse_fields(reading)
+    if reading.get('timestamp') is None:
+        # Sem timestamp, duas leituras do mesmo dispositivo no lote colidiriam no mesmo ponto
+        if device_id in untimed_devices:
+            raise ValueError('"timestamp" obrigatório para várias leituras do mesmo dispositivo no lote')
+        untimed_devices.add(device_id)
+        return device_id, fields, clock.arrival
+    return device_id, fields, clock.check(parse_timestamp(reading['timestamp'], unit))
+
+
+def _window_record(window, default_device, unit, clock):
+    if not isinstance(window, dict):
+        raise ValueError('Janela deve ser um objeto')
+    device_id = _device(window, default_device)
+    if window.get('start') is None:
+        raise ValueError('"start" ausente')
+    start = clock.check(parse_timestamp(window['start'], unit))
+    window_name = WINDOW_DURATIONS.get(window.get('duration_ms'))
+    if window_name is None:
+        raise ValueError(f'"duration_ms" deve ser um de: {", ".join(str(d) for d in WINDOW_DURATIONS)}')
+    count = window.get('count')
+    if isinstance(count, bool) or not isinstance(count, int) or count <= 0:
+        raise ValueError('"count" deve ser um inteiro positivo')
+    fields = {
+        'current_min': _parse_number(window.get('min'), 'min'),
+        'current_max': _parse_number(window.get('max'), 'max'),
+        'current_mean': _parse_number(window.get('mean'), 'mean'),
+        'sample_count': count,
+    }
+    if not fields['current_min'] <= fields['current_mean'] <= fields['current_max']:
+        raise ValueError('Esperado min <= mean <= max')
+    if window.get('rms') is not None:
+        fields['current_rms'] = _parse_number(window['rms'], 'rms')
+        if fields['current_rms'] < 0:
+            raise ValueError('"rms" não pode ser negativo')
+    if window.get('energy') is not None:
+        fields['energy_wh'] = _parse_number(window['energy'], 'energy')
+    return device_id, window_name, fields, start
+
+
+def validate(readings, default_device=None, windows=(), unit=None):
+    """Valida leituras e janelas em uma única passada.
+
+    Retorna ``(reading_records, window_records)`` com timestamps em ns. Se
+    qualquer item for inválido o lote inteiro é rejeitado, para que o
+    dispositivo possa reenviar o mesmo lote sem gravar parte dele duas vezes.
+    """
+    if not readings and not windows:
+        raise InvalidPayload('Nenhuma leitura enviada')
+    if len(readings) > MAX_BATCH_SIZE or len(windows) > MAX_BATCH_SIZE:
+        raise InvalidPayload(f'Lote excede o limite de {MAX_BATCH_SIZE} leituras')
+
+    clock = _Clock()
+    untimed_devices = set()
+    reading_records = []
+    window_records = []
+    errors = []
+    for key, items, parse, records in (
+            ('index', readings, lambda r: _reading_record(r, default_device, unit, clock, untimed_devices),
+             reading_records),
+            ('window', windows, lambda w: _window_record(w, default_device, unit, clock), window_records)):
+        for index, item in enumerate(items):
+            try:
+                records.append(parse(item))
+            except (TypeError, ValueError) as e:
+                errors.append({key: index, 'error': str(e)})
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    break
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            break  # o limite vale para leituras e janelas juntas
+    if errors:
+        raise InvalidPayload('Dados inválidos. Esperado: {"device_id": "...", "current": ...}', errors)
+    return reading_records, window_records
+
+
+def to_points(reading_records, window_records=()):
+    """Monta os ``Point``; retorna ``(points, precisão)``, a mais grossa que preserva todos os timestamps."""
+    precision = choose_precision([r[-1] for r in reading_records] + [w[-1] for w in window_records])
+    divisor = 10 ** 9 // PRECISION_FACTORS[precision]
+    points = []
+    for device_id, fields, timestamp in reading_records:
+        point = Point(MEASUREMENT).tag("device", device_id)
+        for name, value in fields.items():
+            point.field(name, value)
+        points.append(point.time(timestamp // divisor, precision))
+    # Janelas: timestamp = início da janela, o mesmo bucket que aggregateWindow usaria para as leituras brutas
+    for device_id, window_name, fields, start in window_records:
+        point = Point(WINDOW_MEASUREMENT).tag("device", device_id).tag("window", window_name)
+        for name, value in fields.items():
+            point.field(name, value)
+        points.append(point.time(start // divisor, precision))
+    return points, precision
+
+
+def build_points(readings, default_device=None, windows=(), unit=None):
+    """Valida e monta os pontos do lote; retorna ``(points, precisão)``."""
+    return to_points(*validate(readings, default_device, windows, unit))
@@ -0,0 +1,228 @@
+# lambda_function/spool.py
+#
+# Spool local em disco para line protocol que não pôde ser gravado no
+# InfluxDB. Os dados são anexados a segmentos de tamanho limitado e
+# reenviados em lotes grandes quando a escrita volta a funcionar.
+#
+# Em /tmp o spool vive enquanto o ambiente de execução da Lambda estiver
+# quente; apontando SPOOL_DIR para um volume montado (EFS) ele sobrevive a
+# reciclagens e é compartilhado entre ambientes.
+#
+# Um segmento recusado de forma permanente pelo InfluxDB (400 numa linha
+# inválida, 404 de bucket inexistente) não volta para a fila, senão travaria
+# todos os mais novos: é renomeado para .rejected e fica para inspeção, sendo
+# o primeiro a ser descartado quando o spool enche.
+
+import os
+import time
+import uuid
+
+# --- Configuração ---
+SPOOL_DIR = os.environ.get('SPOOL_DIR', '/tmp/wiresense-spool')
+SPOOL_MAX_BYTES = int(os.environ.get('SPOOL_MAX_BYTES', str(64 * 1024 * 1024)))
+SEGMENT_MAX_BYTES = int(os.environ.get('SPOOL_SEGMENT_MAX_BYTES', str(1024 * 1024)))
+REPLAY_MAX_BYTES = int(os.environ.get('SPOOL_REPLAY_MAX_BYTES', str(4 * 1024 * 1024)))
+REPLAY_INTERVAL = float(os.environ.get('SPOOL_REPLAY_INTERVAL', '5'))
+# Segmentos abertos de outros ambientes sem escrita há mais que isso são tratados como fechados
+STALE_SEGMENT_SECONDS = float(os.environ.get('SPOOL_STALE_SECONDS', '60'))
+
+HEADER_PREFIX = b'#wiresense-spool v1 '
+OPEN_SUFFIX = '.open'
+SEALED_SUFFIX = '.lp'
+CLAIMED_SUFFIX = '.replaying'
+REJECTED_SUFFIX = '.rejected'
+
+_sandbox_id = uuid.uuid4().hex[:8]
+_current = None  # (caminho, (bucket, precisão), bytes gravados)
+_last_replay = 0.0
+_stats = {'spooled_bytes': 0, 'replayed_bytes': 0, 'evicted_bytes': 0, 'evicted_segments': 0,
+          'rejected_segments': 0}
+
+
+def stats():
+    return dict(_stats)
+
+
+def _segment_name(suffix):
+    return f'{time.time_ns():020d}-{_sandbox_id}{suffix}'
+
+
+def _header(bucket, precision):
+    return HEADER_PREFIX + f'bucket={bucket} precision={precision}\n'.encode()
+
+
+def _parse_header(line):
+    fields = dict(item.split('=', 1) for item in line[len(HEADER_PREFIX):].decode().split())
+    return fields['bucket'], fields['precision']
+
+
+def _sealed_path(path):
+    stem, _ = os.path.splitext(path)
+    return stem + SEALED_SUFFIX
+
+
+def _seal_current():
+    global _current
+    if _current is None:
+        return
+    path = _current[0]
+    _current = None
+    try:
+        os.rename(path, _sealed_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def _segments():
+    """Segmentos prontos para reenvio, do mais antigo para o mais novo."""
+    try:
+        entries = list(os.scandir(SPOOL_DIR))
+    except FileNotFoundError:
+        return []
+    now = time.time()
+    current_path = _current[0] if _current else None
+    ready = []
+    for entry in entries:
+        if entry.name.endswith(SEALED_SUFFIX):
+            ready.append(entry)
+        elif entry.name.endswith(OPEN_SUFFIX) and entry.path != current_path:
+            try:
+                if now - entry.stat().st_mtime > STALE_SEGMENT_SECONDS:
+                    ready.append(entry)
+            except FileNotFoundError:
+                pass
+        elif entry.name.endswith(CLAIMED_SUFFIX):
+            # Reenvio interrompido (timeout da Lambda): devolve o segmento para a fila
+            try:
+                if now - entry.stat().st_ctime > STALE_SEGMENT_SECONDS:
+                    os.rename(entry.path, _sealed_path(entry.path))
+            except FileNotFoundError:
+                pass
+    ready.sort(key=lambda e: e.name)
+    return ready
+
+
+def _rejected():
+    try:
+        entries = [entry for entry in os.scandir(SPOOL_DIR) if entry.name.endswith(REJECTED_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.name)
+    return entries
+
+
+def _total_size():
+    total = 0
+    try:
+        for entry in os.scandir(SPOOL_DIR):
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+    except FileNotFoundError:
+        pass
+    return total
+
+
+def _enforce_limit():
+    """Descarta os segmentos recusados e depois os mais antigos até o spool caber em SPOOL_MAX_BYTES."""
+    total = _total_size()
+    if total <= SPOOL_MAX_BYTES:
+        return
+    for entry in _rejected() + _segments():
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        _stats['evicted_bytes'] += size
+        _stats['evicted_segments'] += 1
+        print(f"Spool cheio: segmento {entry.name} descartado ({size} bytes)")
+        if total <= SPOOL_MAX_BYTES:
+            return
+
+
+def append(bucket, precision, payload):
+    """Anexa ``payload`` (line protocol em bytes) ao segmento aberto deste ambiente."""
+    global _current
+    key = (bucket, str(precision))
+    if not payload.endswith(b'\n'):
+        payload += b'\n'
+    if _current is not None and (_current[1] != key or _current[2] + len(payload) > SEGMENT_MAX_BYTES):
+        _seal_current()
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    if _current is None:
+        path = os.path.join(SPOOL_DIR, _segment_name(OPEN_SUFFIX))
+        header = _header(*key)
+        with open(path, 'wb') as f:
+            f.write(header)
+        _current = (path, key, len(header))
+    path, _, size = _current
+    with open(path, 'ab') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    _current = (path, key, size + len(payload))
+    _stats['spooled_bytes'] += len(payload)
+    _enforce_limit()
+
+
+def pending():
+    return _current is not None or bool(_segments())
+
+
+def replay(write_fn, force=False, is_retryable=lambda error: True):
+    """Reenvia segmentos (mais antigos primeiro) via ``write_fn(bucket, precision, payload)``.
+
+    Limitado a REPLAY_MAX_BYTES por chamada e a uma tentativa a cada
+    REPLAY_INTERVAL segundos. Um segmento só é removido após ser gravado; na
+    primeira falha temporária (``is_retryable``) o reenvio para e o segmento
+    volta para a fila. Falhas permanentes (ou cabeçalho ilegível) marcam o
+    segmento como recusado e o reenvio segue para o próximo.
+    Retorna o número de bytes reenviados.
+    """
+    global _last_replay
+    now = time.monotonic()
+    if not force and now - _last_replay < REPLAY_INTERVAL:
+        return 0
+    _last_replay = now
+    _seal_current()
+
+    sent = 0
+    for entry in _segments():
+        if sent >= REPLAY_MAX_BYTES:
+            break
+        claimed = os.path.splitext(entry.path)[0] + CLAIMED_SUFFIX
+        try:
+            os.rename(entry.path, claimed)  # outro ambiente pode ter reivindicado o segmento
+        except FileNotFoundError:
+            continue
+        try:
+            with open(claimed, 'rb') as f:
+                header = f.readline()
+                payload = f.read()
+            bucket, precision = _parse_header(header)
+        except (ValueError, KeyError) as e:
+            _reject(claimed, f'cabeçalho inválido ({e})')
+            continue
+        try:
+            if payload:
+                write_fn(bucket, precision, payload)
+        except Exception as e:
+            if is_retryable(e):
+                os.rename(claimed, _sealed_path(claimed))
+                raise
+            _reject(claimed, e)
+            continue
+        os.remove(claimed)
+        sent += len(payload)
+        _stats['replayed_bytes'] += len(payload)
+    return sent
+
+
+def _reject(claimed, reason):
+    rejected = os.path.splitext(claimed)[0] + REJECTED_SUFFIX
+    os.rename(claimed, rejected)
+    _stats['rejected_segments'] += 1
+    print(f"Spool: segmento {os.path.basename(rejected)} recusado, fora da fila: {reason}")
@@ -0,0 +1,89 @@
+# lambda_read_data/downsample.py
+#
+# Redução de séries para gráficos. O Flux agrega o intervalo em uma janela
+# escolhida pelo tamanho do range (algumas vezes mais pontos que o pedido) e
+# aqui o Largest-Triangle-Three-Buckets escolhe, em cada bucket, o ponto que
+# mais preserva a forma da curva. A coluna de pico, quando existe, recebe o
+# máximo do bucket inteiro, então nenhum pico some na redução.
+
+import math
+from flux_csv import rfc3339_ms
+
+# Janelas de agregação possíveis no Flux (s), da mais fina para a mais grossa
+RESOLUTIONS = {'10s': 10, '30s': 30, '1m': 60, '5m': 300, '15m': 900, '1h': 3600,
+               '3h': 10800, '6h': 21600, '12h': 43200, '1d': 86400}
+# Pontos agregados pelo Flux para cada ponto entregue, margem para o LTTB escolher
+OVERSAMPLE = 4
+
+
+def choose_resolution(range_seconds, max_points):
+    """Menor janela que entrega até ``max_points * OVERSAMPLE`` pontos no intervalo."""
+    target = range_seconds / (max_points * OVERSAMPLE)
+    return next((name for name, seconds in RESOLUTIONS.items() if seconds >= target), '1d')
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def lttb(xs, ys, threshold):
+    """Índices escolhidos pelo LTTB (sempre inclui o primeiro e o último) e os limites dos buckets."""
+    size = len(xs)
+    every = (size - 2) / (threshold - 2)
+    selected = [0]
+    bounds = [(0, 1)]
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # Média do próximo bucket (ou o último ponto) como terceiro vértice do triângulo
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        if end >= next_end:
+            avg_x, avg_y = xs[-1], ys[-1]
+        else:
+            avg_x = sum(xs[end:next_end]) / (next_end - end)
+            avg_y = sum(ys[end:next_end]) / (next_end - end)
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((ax - avg_x) * (ys[index] - ay) - (ax - xs[index]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        bounds.append((start, end))
+        a = best
+    selected.append(size - 1)
+    bounds.append((size - 1, size))
+    return selected, bounds
+
+
+def downsample(rows, max_points, peak_index=None):
+    """Reduz as linhas (timestamp RFC3339, valor, ...) a no máximo ``max_points`` (>= 3).
+
+    Linhas sem valor numérico não entram no gráfico e são descartadas antes da redução.
+    """
+    rows = list(rows)
+    if len(rows) <= max_points:
+        return rows
+    points = [(row, _number(row[1])) for row in rows]
+    points = [(row, value) for row, value in points if value is not None]
+    if len(points) <= max_points:
+        return [row for row, _ in points]
+    xs = [rfc3339_ms(row[0]) for row, _ in points]
+    ys = [value for _, value in points]
+    selected, bounds = lttb(xs, ys, max_points)
+    if peak_index is None:
+        return [points[index][0] for index in selected]
+    result = []
+    for index, (start, end) in zip(selected, bounds):
+        row = points[index][0]
+        peaks = [(_number(points[i][0][peak_index]), points[i][0][peak_index]) for i in range(start, end)]
+        peaks = [peak for peak in peaks if peak[0] is not None]
+        if peaks:
+            row = row[:peak_index] + (max(peaks)[1],) + row[peak_index + 1:]
+        result.append(row)
+    return result
@@ -0,0 +1,122 @@
+# lambda_read_data/flux_csv.py
+#
+# Caminho direto CSV -> JSON para consultas com muitas linhas (range). Em vez
+# de query() (TableList -> FluxTable -> FluxRecord -> dict por linha, com
+# datetime em cada _time), a resposta é pedida sem anotações, lida em
+# streaming com csv.reader, e só as colunas necessárias são copiadas por
+# índice para a saída JSON. Os timestamps passam adiante como as strings
+# RFC3339 que o InfluxDB enviou.
+
+import calendar
+import codecs
+import csv
+from influxdb_client import Dialect
+
+CSV_DIALECT = Dialect(header=True, delimiter=",", comment_prefix="#", annotations=[], date_time_format="RFC3339")
+# Valores float que não existem em JSON
+_NOT_JSON = {'NaN', '+Inf', '-Inf', 'Inf'}
+
+
+class FluxQueryError(Exception):
+    pass
+
+
+def iter_rows(lines, columns):
+    """Tuplas com os ``columns`` pedidos de cada linha de dados ('' quando a coluna não existe)."""
+    reader = csv.reader(lines)
+    indexes = None
+    for row in reader:
+        if len(row) < 2:
+            continue
+        if row[1] == 'result' and 'table' in row:  # cabeçalho (repetido a cada mudança de esquema)
+            indexes = [row.index(name) if name in row else None for name in columns]
+            continue
+        if row[1] == 'error' and indexes is None:
+            # Erros do Flux chegam como uma tabela "error,reference"
+            row = next(reader, None)
+            raise FluxQueryError(row[1] if row and len(row) > 1 else 'Erro na consulta Flux')
+        if indexes is not None:
+            yield tuple(row[i] if i is not None else '' for i in indexes)
+
+
+def write_json(rows, keys, optional=()):
+    """Serializa as linhas como lista JSON de objetos ``keys``; a primeira chave é o timestamp.
+
+    Chaves em ``optional`` só entram no objeto quando têm valor. Retorna
+    ``(json, linhas)`` com o mesmo formato de ``json.dumps`` para a lista de dicts.
+    """
+    parts = []
+    append = parts.append
+    names = [f'"{key}": ' for key in keys]
+    for row in rows:
+        fields = []
+        for index, (name, value) in enumerate(zip(names, row)):
+            if not value or value in _NOT_JSON:
+                if keys[index] in optional:
+                    continue
+                fields.append(name + 'null')
+            elif index == 0:
+                fields.append(f'{name}"{value}"')
+            else:
+                fields.append(name + value)
+        append('{' + ', '.join(fields) + '}')
+    return '[' + ', '.join(parts) + ']', len(parts)
+
+
+# --- Formato colunar: {"t": [epoch ms], "v": [...], <campo>: [...]} ---
+_minute_ms = {}
+
+
+def rfc3339_ms(value):
+    """Epoch ms de um timestamp RFC3339 UTC do InfluxDB ("2024-01-01T00:00:10.5Z"), sem datetime.
+
+    Linhas vizinhas compartilham o mesmo minuto, então só segundos e fração são convertidos por linha.
+    """
+    minute = _minute_ms.get(value[:17])
+    if minute is None:
+        if len(_minute_ms) > 100000:
+            _minute_ms.clear()
+        minute = _minute_ms[value[:17]] = calendar.timegm(
+            (int(value[:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]), int(value[14:16]), 0)) * 1000
+    if value[19] == '.':
+        return minute + int(value[17:19]) * 1000 + int(value[20:-1][:3].ljust(3, '0'))
+    return minute + int(value[17:19]) * 1000
+
+
+def write_columnar(rows, keys, delta=False):
+    """Serializa as linhas em colunas; ``keys[0]`` é o timestamp ("t") e ``keys[1]`` o valor principal ("v").
+
+    Com ``delta`` os timestamps vão como diferenças para o anterior (o primeiro é absoluto).
+    Colunas extras sem nenhum valor são omitidas. Retorna ``(json, linhas)``.
+    """
+    times = []
+    columns = [[] for _ in keys[1:]]
+    appends = [column.append for column in columns]
+    previous = 0
+    for row in rows:
+        timestamp = rfc3339_ms(row[0])
+        times.append(timestamp - previous if delta else timestamp)
+        if delta:
+            previous = timestamp
+        for append, value in zip(appends, row[1:]):
+            append(value if value and value not in _NOT_JSON else 'null')
+    parts = ['"t": [' + ', '.join(map(str, times)) + ']']
+    for index, (key, column) in enumerate(zip(keys[1:], columns)):
+        if index and all(value == 'null' for value in column):
+            continue
+        parts.append(f'"{"v" if index == 0 else key}": [' + ', '.join(column) + ']')
+    if delta:
+        parts.append('"delta": true')
+    return '{' + ', '.join(parts) + '}', len(times)
+
+
+def stream_json(client, query, org, params, columns, render):
+    """Executa ``query`` lendo a resposta CSV em streaming; ``render(linhas)`` monta o JSON.
+
+    Retorna o que ``render`` retornar, ``(json, linhas)`` para write_json/write_columnar.
+    """
+    response = client.query_api().query_raw(query, org=org, dialect=CSV_DIALECT, params=params)
+    try:
+        return render(iter_rows(codecs.iterdecode(response, 'utf-8'), columns))
+    finally:
+        response.release_conn()
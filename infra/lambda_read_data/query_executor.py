@@ -0,0 +1,56 @@
+# lambda_read_data/query_executor.py
+#
+# Executa consultas Flux independentes em paralelo sobre o cliente
+# compartilhado (influx_pool), para que um endpoint com várias consultas
+# custe o tempo da mais lenta e não a soma de todas. O pool do urllib3 do
+# cliente (cpu_count * 5 conexões) comporta as threads sem abrir conexões extras.
+# Hoje quem usa é o "latest", que busca janelas e leituras brutas ao mesmo tempo.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# --- Configuração ---
+QUERY_WORKERS = int(os.environ.get('QUERY_WORKERS', '4'))
+# Prazo total das consultas de uma requisição; fica abaixo do limite de 29 s do API Gateway
+QUERY_TIMEOUT = float(os.environ.get('QUERY_TIMEOUT_SECONDS', '10'))
+
+# Criado na primeira consulta em paralelo (fora do cold start) e reaproveitado entre invocações "quentes"
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='flux')
+        return _executor
+
+
+def run_all(queries, fetch, timeout=QUERY_TIMEOUT):
+    """Executa ``fetch(consulta)`` para cada item de ``queries`` (nome -> consulta) em paralelo.
+
+    Retorna ``(resultados, falhas)``. Consultas que levantaram erro ou não
+    terminaram dentro de ``timeout`` ficam fora de ``resultados`` e aparecem
+    em ``falhas`` (nome -> motivo); as demais são aproveitadas normalmente.
+    """
+    started = time.monotonic()
+    executor = _get_executor()
+    futures = {name: executor.submit(fetch, query) for name, query in queries.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    failures = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            failures[name] = f'timeout após {timeout:g}s'
+        elif future.exception() is not None:
+            failures[name] = str(future.exception())
+        else:
+            results[name] = future.result()
+    if failures:
+        print(f"Consultas com falha {failures} ({time.monotonic() - started:.2f}s)")
+    return results, failures
@@ -1,54 +1,711 @@
 # lambda_read_data/read_data.py
 
 import os
+import re
+import time
 import json
-import boto3
-from influxdb_client import InfluxDBClient
-from datetime import datetime
+import credentials
+import flux_csv
+from downsample import RESOLUTIONS, choose_resolution, downsample
+import influx_pool
+import query_executor
+from result_cache import CACHE_TTLS, ResultCache
+from singleflight import SingleFlight
+from datetime import datetime, timedelta, timezone
 
 # --- Configuração inicial ---
-secrets_manager = boto3.client('secretsmanager')
 influx_url = os.environ['INFLUXDB_URL']
-secret_arn = os.environ['SECRET_ARN']
-cached_secret = None
+credential_cache = credentials.CredentialCache()
 
 # --- Função para obter credenciais do InfluxDB ---
 def get_influx_credentials():
-    global cached_secret
-    if cached_secret:
-        return cached_secret
-    try:
-        response = secrets_manager.get_secret_value(SecretId=secret_arn)
-        secret_data = json.loads(response['SecretString'])
-        cached_secret = {
-            'token': secret_data['INFLUXDB_INIT_ADMIN_TOKEN'],
-            'org': secret_data['INFLUXDB_ORG'],
-            'bucket': secret_data['INFLUXDB_BUCKET']
-        }
-        return cached_secret
-    except Exception as e:
-        print(f"Erro ao buscar segredo: {e}")
-        raise e
+    return credential_cache.get()
+
+# --- Janelas pré-agregadas pelos dispositivos (measurement "environment_window") ---
+WINDOW_SIZES = {'1s': 1, '5s': 5, '10s': 10, '30s': 30, '1m': 60, '5m': 300, '15m': 900, '1h': 3600}
+RANGE_RESOLUTION = '10s'
+
+
+def window_filter(resolution):
+    # Só janelas que cabem na resolução pedida preservam o resultado da agregação
+    limit = RESOLUTIONS[resolution]
+    names = [name for name, seconds in WINDOW_SIZES.items() if seconds <= limit]
+    return ' or '.join(f'r.window == "{name}"' for name in names)
+
+
+# --- Campos elétricos da measurement "environment" ---
+# Médias por janela fazem sentido para as grandezas instantâneas; o contador de energia usa o último valor
+MEAN_FIELDS = ['current', 'voltage', 'power', 'apparent_power', 'power_factor']
+COUNTER_FIELD = 'energy_total_wh'
+
+
+def fields_filter(fields):
+    return ' or '.join(f'r["_field"] == "{name}"' for name in fields)
+
+
+def electrical_point(record):
+    # Sempre inclui "current" (formato original); os demais só quando o dispositivo os envia
+    point = {"time": record.get('_time'), "current": record.get('current')}
+    for name in MEAN_FIELDS[1:] + [COUNTER_FIELD]:
+        if record.get(name) is not None:
+            point[name] = record[name]
+    return point
+
+
+# --- Energia integrada na ingestão (measurement "energia_integrada") ---
+# Cada ambiente da Lambda de ingestão grava seu total parcial por dia; o total do dia é a soma.
+# Sem esses pontos, as consultas caem para "energia_diaria", produzida externamente.
+ENERGY_UTC_OFFSET_MINUTES = int(os.environ.get('ENERGY_UTC_OFFSET_MINUTES', '0'))
+
+
+def flux_preamble(*imports):
+    # Imports e, se configurado, o fuso usado por date.truncate/aggregateWindow para delimitar os dias
+    modules = list(imports) + (['timezone'] if ENERGY_UTC_OFFSET_MINUTES else [])
+    lines = [f'import "{module}"' for module in modules]
+    if ENERGY_UTC_OFFSET_MINUTES:
+        lines.append(f'option location = timezone.fixed(offset: {ENERGY_UTC_OFFSET_MINUTES}m)')
+    return '\n'.join(lines)
+
+
+def integrated_energy(start, device_filter):
+    return f'''
+        from(bucket: param_longterm_bucket) |> range(start: {start})
+          |> filter(fn: (r) => r._measurement == "energia_integrada" and r._field == "kwh" and r.period == "1d")
+          {device_filter}
+          |> group()
+    '''
+
+
+# --- Resumo: hoje, ontem, mês atual e mês anterior em uma consulta ---
+SUMMARY_PERIODS = ('today', 'yesterday', 'month', 'previous_month')
+
+
+def summary_query(device_filter):
+    # "data" é lido uma vez e compartilhado pelos ramos; cada ramo soma os totais diários do seu período.
+    # energia_diaria traz o total acumulado do dia (último valor por dispositivo);
+    # energia_integrada traz parciais por ambiente da ingestão (soma de todos).
+    return f'''
+        {flux_preamble("date")}
+        today = date.truncate(t: now(), unit: 1d)
+        yesterday = date.sub(d: 1d, from: today)
+        month = date.truncate(t: now(), unit: 1mo)
+        previous_month = date.sub(d: 1mo, from: month)
+
+        data = from(bucket: param_longterm_bucket) |> range(start: previous_month)
+          |> filter(fn: (r) => (r._measurement == "energia_integrada" and r._field == "kwh" and r.period == "1d")
+                            or (r._measurement == "energia_diaria" and r._field == "kwh_total_diario"))
+          {device_filter}
+
+        integrated = data |> filter(fn: (r) => r._measurement == "energia_integrada")
+          |> group(columns: ["_measurement"])
+          |> aggregateWindow(every: 1d, fn: sum, timeSrc: "_start", createEmpty: false)
+        legacy = data |> filter(fn: (r) => r._measurement == "energia_diaria")
+          |> group(columns: ["_measurement", "device"])
+          |> aggregateWindow(every: 1d, fn: last, timeSrc: "_start", createEmpty: false)
+          |> group(columns: ["_measurement"])
+        daily = union(tables: [integrated, legacy])
+
+        total = (tables=<-, name) => tables |> sum() |> set(key: "period", value: name)
+        union(tables: [
+            daily |> filter(fn: (r) => r._time >= today) |> total(name: "today"),
+            daily |> filter(fn: (r) => r._time >= yesterday and r._time < today) |> total(name: "yesterday"),
+            daily |> filter(fn: (r) => r._time >= month) |> total(name: "month"),
+            daily |> filter(fn: (r) => r._time < month) |> total(name: "previous_month")
+        ])
+    '''
+
+
+def summary_totals(records):
+    """``{período: kWh}``; usa energia_integrada quando existe, senão energia_diaria."""
+    by_source = {}
+    for record in records:
+        if record.get('period') in SUMMARY_PERIODS and record.get('_value') is not None:
+            by_source.setdefault(record.get('_measurement'), {})[record['period']] = record['_value']
+    return by_source.get('energia_integrada') or by_source.get('energia_diaria') or {}
+
+
+# --- Picos diários (measurement "pico_diario", rollup mantido pela ingestão) ---
+# Um ponto por dispositivo, dia e ambiente da ingestão: máximo, instante do máximo e histograma
+# logarítmico das correntes. Faixas de PEAK_HISTOGRAM_GROWTH, o mesmo valor de peaks.py na ingestão.
+PEAK_HISTOGRAM_GROWTH = 1.02
+
+
+def histogram_percentile(bins, fraction):
+    # Centro (geométrico) da faixa onde a contagem acumulada atinge a fração pedida
+    threshold = fraction * sum(bins.values())
+    seen = 0
+    for bin_ in sorted(bins):
+        seen += bins[bin_]
+        if seen >= threshold:
+            return PEAK_HISTOGRAM_GROWTH ** (bin_ + 0.5)
+    return None
+
+
+def daily_peaks(records, limit):
+    """Combina os parciais por dia local: maior máximo, seu instante e o p95 dos histogramas somados."""
+    days = {}
+    for record in records:
+        if record.get('current_max') is None:
+            continue
+        local = datetime.fromisoformat(record['_time']) + timedelta(minutes=ENERGY_UTC_OFFSET_MINUTES)
+        day = days.setdefault(local.date().isoformat(), {'max': None, 'max_time': None, 'bins': {}})
+        if day['max'] is None or record['current_max'] > day['max']:
+            day['max'], day['max_time'] = record['current_max'], record.get('max_time')
+        for item in (record.get('histogram') or '').split():
+            bin_, count = item.split(':')
+            day['bins'][int(bin_)] = day['bins'].get(int(bin_), 0) + int(count)
+    points = []
+    for date, day in sorted(days.items())[-limit:]:
+        p95 = histogram_percentile(day['bins'], 0.95)
+        points.append({
+            "x": date,
+            "y": day['max'],
+            "peak_time": (datetime.fromtimestamp(day['max_time'] / 1000, tz=timezone.utc).isoformat()
+                          if day['max_time'] is not None else None),
+            "p95": round(p95, 2) if p95 is not None else None,
+        })
+    return points
+
+
+# --- Consultas parametrizadas ---
+# O texto Flux de cada consulta é fixo e montado uma única vez por variante (número de dispositivos
+# filtrados); os valores da requisição vão em ``params`` e chegam ao InfluxDB como opções
+# ("option param_device_0 = ...") no AST externo, nunca concatenados ao script.
+_templates = {}
+
+
+def device_filter(count):
+    # Igualdades encadeadas com "or" ainda descem para o storage como predicado de tag;
+    # contains(set: [...]) obrigaria o InfluxDB a ler todos os dispositivos e filtrar depois.
+    if not count:
+        return ''
+    matches = ' or '.join(f'r["device"] == param_device_{i}' for i in range(count))
+    return f'|> filter(fn: (r) => {matches})'
+
+
+def flux_template(name, device_ids, build):
+    """Texto de ``name``; ``build(device_filter)`` só roda na primeira vez de cada variante.
+
+    A variante é o número de dispositivos filtrados (0 = todos), então os textos ficam limitados
+    a ``MAX_DEVICES`` por consulta.
+    """
+    key = (name, len(device_ids))
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = build(device_filter(len(device_ids)))
+    return template
+
+
+def device_params(flux_params, device_ids):
+    """``flux_params`` com o filtro de dispositivos trocado por ``device_ids`` (mesma numeração do template)."""
+    params = {name: value for name, value in flux_params.items() if not name.startswith('param_device_')}
+    params.update((f'param_device_{i}', device) for i, device in enumerate(device_ids))
+    return params
+
+
+class InvalidQuery(Exception):
+    pass
+
+
+class QueryFailed(Exception):
+    """Falha do InfluxDB; a resposta vira 502 e não entra no cache."""
+
+
+RANGE_PATTERN = re.compile(r'-?(\d{1,6})(s|m|h|d|w)')
+RANGE_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+MAX_QUERY_RANGE = timedelta(days=int(os.environ.get('MAX_QUERY_RANGE_DAYS', '31')))
+MAX_HISTORY_LIMIT = int(os.environ.get('MAX_HISTORY_LIMIT', '366'))
+HISTORY_PERIODS = ('daily', 'monthly', 'peak')
+# Pontos por série em "range"; o gráfico recebe no máximo isso, qualquer que seja o intervalo
+DEFAULT_MAX_POINTS = int(os.environ.get('DEFAULT_MAX_POINTS', '1500'))
+MAX_POINTS_LIMIT = int(os.environ.get('MAX_POINTS_LIMIT', '10000'))
+# Dispositivos por requisição em "devices" (latest e range); "all" não tem limite
+MAX_DEVICES = int(os.environ.get('MAX_DEVICES', '50'))
+# Busca incremental: quanto antes do cursor refazer a consulta, para pegar leituras que chegam atrasadas
+RANGE_LATE_MARGIN_SECONDS = int(os.environ.get('RANGE_LATE_MARGIN_SECONDS', '120'))
+SINCE_MAX_SKEW_SECONDS = int(os.environ.get('SINCE_MAX_SKEW_SECONDS', '300'))
+BATCH_TYPES = ('latest', 'range')
+
+
+def parse_range(value):
+    # Só durações relativas simples ("-5m", "24h", "7d"), limitadas a MAX_QUERY_RANGE_DAYS
+    m = RANGE_PATTERN.fullmatch(value.strip())
+    if not m:
+        raise InvalidQuery('Parâmetro "range" inválido; use, por exemplo, -5m, -24h ou -7d')
+    duration = timedelta(**{RANGE_UNITS[m.group(2)]: int(m.group(1))})
+    if not timedelta(0) < duration <= MAX_QUERY_RANGE:
+        raise InvalidQuery(f'Parâmetro "range" deve estar entre 1s e {MAX_QUERY_RANGE.days}d')
+    return duration
+
+
+# Formato colunar opcional para séries: ?format=columnar (&delta=1) ou "Accept: application/vnd.wiresense.columnar+json"
+COLUMNAR_TYPE = 'application/vnd.wiresense.columnar+json'
+RESPONSE_FORMATS = ('json', 'columnar')
+
+
+def response_format(query_params, headers):
+    requested = query_params.get('format')
+    if requested is None:
+        accept = next((value for name, value in headers.items() if name.lower() == 'accept'), '') or ''
+        requested = 'columnar' if COLUMNAR_TYPE in accept else 'json'
+    if requested not in RESPONSE_FORMATS:
+        raise InvalidQuery(f'Parâmetro "format" deve ser um de: {", ".join(RESPONSE_FORMATS)}')
+    if requested == 'columnar' and query_params.get('delta') in ('1', 'true'):
+        return 'columnar_delta'
+    return requested
+
+
+def series_renderer(fmt, keys, max_points, peak_index=None, optional=(), since=None, cursor=False):
+    """Função que reduz as linhas de uma série a ``max_points`` e serializa no formato negociado.
+
+    Com ``since`` (busca incremental) ou ``cursor`` a resposta leva também o ``cursor``: o timestamp
+    (epoch ms) do último ponto, ou o próprio ``since`` (``null`` na carga inicial) se nada chegou.
+    JSON vira ``{"points", "cursor"}``; o colunar ganha a chave ``cursor``.
+    """
+    def render(rows):
+        rows = downsample(rows, max_points, peak_index)
+        if fmt == 'json':
+            return flux_csv.write_json(rows, keys, optional)
+        return flux_csv.write_columnar(rows, keys, delta=fmt == 'columnar_delta')
+
+    if since is None and not cursor:
+        return render
+
+    def render_with_cursor(rows):
+        last = [None]
+
+        def tracked():
+            for row in rows:
+                last[0] = row[0]
+                yield row
+        body, count = render(tracked())
+        next_cursor = flux_csv.rfc3339_ms(last[0]) if last[0] else json.dumps(since)
+        if fmt == 'json':
+            return f'{{"points": {body}, "cursor": {next_cursor}}}', count
+        return f'{body[:-1]}, "cursor": {next_cursor}}}', count
+    return render_with_cursor
+
+
+def group_by_device(rows):
+    """Separa as linhas (última coluna = dispositivo) em ``{dispositivo: linhas}`` em uma passada."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[-1], []).append(row[:-1])
+    return groups
+
+
+def device_series(series, device_ids, empty_render):
+    """Serializa ``{dispositivo: (render, linhas)}`` como ``{dispositivo: série}``.
+
+    Cada dispositivo usa o ``render`` da sua fonte (janelas ou leituras brutas); dispositivos
+    pedidos sem dados aparecem com a série vazia de ``empty_render``.
+    """
+    parts = []
+    total = 0
+    for device in sorted(set(series) | set(device_ids)):
+        render, rows = series.get(device, (empty_render, []))
+        body, count = render(rows)
+        parts.append(f'{json.dumps(device)}: {body}')
+        total += count
+    return '{' + ', '.join(parts) + '}', total
+
+
+def parse_devices(query_type, query_params):
+    # "devices=a,b,c" ou "devices=all": uma consulta para vários dispositivos, resposta por dispositivo
+    value = query_params['devices'].strip()
+    if query_type not in BATCH_TYPES:
+        raise InvalidQuery(f'Parâmetro "devices" só é aceito nos tipos: {", ".join(BATCH_TYPES)}')
+    if query_params.get('device_id'):
+        raise InvalidQuery('Use "device_id" ou "devices", não os dois')
+    if query_params.get('since') is not None:
+        raise InvalidQuery('Parâmetro "since" não é aceito com "devices"')
+    if value == 'all':
+        return value
+    devices = tuple(sorted({device.strip() for device in value.split(',') if device.strip()}))
+    if not 1 <= len(devices) <= MAX_DEVICES:
+        raise InvalidQuery(f'Parâmetro "devices" deve ter entre 1 e {MAX_DEVICES} dispositivos, ou ser "all"')
+    return devices
+
+
+def parse_query_params(query_type, query_params, headers=None):
+    """Valida e normaliza os parâmetros da requisição (valores padrão aplicados)."""
+    params = {'device_id': query_params.get('device_id') or None}
+    if query_params.get('devices') is not None:
+        params['devices'] = parse_devices(query_type, query_params)
+    if query_type in ('latest', 'range'):
+        # "window" é o nome usado pelo dashboard (data?window=5m)
+        requested = query_params.get('range') or query_params.get('window') or '-5m'
+        params['range'] = parse_range(requested if query_type == 'range' else '-5m')
+    if query_type == 'range':
+        params['format'] = response_format(query_params, headers or {})
+        try:
+            params['max_points'] = int(query_params.get('max_points', DEFAULT_MAX_POINTS))
+        except ValueError:
+            raise InvalidQuery('Parâmetro "max_points" deve ser um inteiro') from None
+        if not 3 <= params['max_points'] <= MAX_POINTS_LIMIT:
+            raise InvalidQuery(f'Parâmetro "max_points" deve estar entre 3 e {MAX_POINTS_LIMIT}')
+        if query_params.get('since') is not None:
+            try:
+                params['since'] = int(query_params['since'])
+            except ValueError:
+                raise InvalidQuery('Parâmetro "since" deve ser um epoch em ms (o "cursor" da resposta anterior)') from None
+            # Relógio do cliente adiantado até SINCE_MAX_SKEW_SECONDS ainda vale (a consulta não passa de agora)
+            if not 0 <= params['since'] <= (time.time() + SINCE_MAX_SKEW_SECONDS) * 1000:
+                raise InvalidQuery('Parâmetro "since" deve ser um epoch em ms entre 0 e o instante atual')
+    elif query_type == 'history':
+        params['period'] = query_params.get('period', 'daily')
+        if params['period'] not in HISTORY_PERIODS:
+            raise InvalidQuery(f'Parâmetro "period" deve ser um de: {", ".join(HISTORY_PERIODS)}')
+        try:
+            params['limit'] = int(query_params.get('limit', 7))
+        except ValueError:
+            raise InvalidQuery('Parâmetro "limit" deve ser um inteiro') from None
+        if not 1 <= params['limit'] <= MAX_HISTORY_LIMIT:
+            raise InvalidQuery(f'Parâmetro "limit" deve estar entre 1 e {MAX_HISTORY_LIMIT}')
+    return params
+
 
 # --- Função de consulta ao InfluxDB ---
-def query_influx(query, org):
-    creds = get_influx_credentials()
+def fetch_influx(query, org, params=None):
+    """Executa a consulta e retorna os registros como dicts; falhas viram ``QueryFailed``."""
     results = []
     try:
-        with InfluxDBClient(url=influx_url, token=creds['token'], org=org) as client:
-            query_api = client.query_api()
-            tables = query_api.query(query, org=org)
-            for table in tables:
-                for record in table.records:
-                    record_dict = record.values
-                    for k in ['_time', 'x']:
-                        if k in record_dict and isinstance(record_dict[k], datetime):
-                            record_dict[k] = record_dict[k].isoformat()
-                    results.append(record_dict)
+        # Token rotacionado: um 401 busca o segredo de novo e repete a consulta
+        tables = credential_cache.call(lambda creds: influx_pool.call_with_retry(
+            influx_url, creds['token'], org, lambda client: client.query_api().query(query, org=org, params=params)))
     except Exception as e:
-        print(f"Erro ao consultar InfluxDB: {e}")
+        raise QueryFailed(e) from e
+    for table in tables:
+        for record in table.records:
+            record_dict = record.values
+            for k in ['_time', 'x']:
+                if k in record_dict and isinstance(record_dict[k], datetime):
+                    record_dict[k] = record_dict[k].isoformat()
+            results.append(record_dict)
     return results
 
+
+def stream_influx(query, org, params, columns, render):
+    """Consulta em streaming direto para JSON (flux_csv); retorna ``(json, linhas)``."""
+    try:
+        return credential_cache.call(lambda creds: influx_pool.call_with_retry(
+            influx_url, creds['token'], org,
+            lambda client: flux_csv.stream_json(client, query, org, params, columns, render)))
+    except Exception as e:
+        raise QueryFailed(e) from e
+
+
+def query_many(queries, org, params=None):
+    """Consultas independentes em paralelo; retorna ``(resultados, falhas)`` por nome."""
+    return query_executor.run_all(queries, lambda query: fetch_influx(query, org, params))
+
+
+# --- Cache e coalescência de respostas ---
+result_cache = ResultCache()
+coalescer = SingleFlight()
+
+
+def cache_key(route_name, params):
+    # Parâmetros já normalizados por parse_query_params: "-5m" e "5m" caem na mesma entrada
+    return (route_name,) + tuple(sorted(params.items(), key=lambda item: item[0]))
+
+
+# --- Consultas de cada endpoint ---
+def latest_by_device(records, point):
+    """``{dispositivo: point(registro)}`` com o registro mais recente de cada dispositivo."""
+    latest = {}
+    for record in records:
+        device = record.get('device')
+        if device and (device not in latest or record['_time'] > latest[device]['_time']):
+            latest[device] = record
+    return {device: point(record) for device, record in sorted(latest.items())}
+
+
+def query_context(params):
+    """``(org, flux_params, device_ids)`` comuns às consultas de uma requisição."""
+    creds = get_influx_credentials()
+    org = creds['org']
+    bucket = creds['bucket']
+    # Em lote ("devices") a resposta vem separada por dispositivo; "all" não filtra
+    if 'devices' in params:
+        device_ids = [] if params['devices'] == 'all' else list(params['devices'])
+    else:
+        device_ids = [params['device_id']] if params['device_id'] else []
+    flux_params = {
+        'param_bucket': bucket,
+        'param_longterm_bucket': f"{bucket}_longterm",
+        'param_start': -params['range'] if 'range' in params else None,
+        'param_limit': params.get('limit'),
+    }
+    flux_params.update((f'param_device_{i}', device) for i, device in enumerate(device_ids))
+    return org, flux_params, device_ids
+
+
+def query_devices(params):
+    """Dispositivos com dados no bucket."""
+    org, flux_params, _ = query_context(params)
+    flux_query = flux_template('devices', [], lambda device_filter: '''
+        import "influxdata/influxdb/schema"
+        schema.tagValues(bucket: param_bucket, tag: "device")
+    ''')
+    raw_results = fetch_influx(flux_query, org, flux_params)
+    # Extrair apenas os valores das tags
+    results_body = [r.get('_value') for r in raw_results if r.get('_value')]
+    return json.dumps(results_body, default=str)
+
+
+def query_latest(params):
+    """Último ponto do dispositivo (ou ``{dispositivo: ponto}`` em lote)."""
+    org, flux_params, device_ids = query_context(params)
+    batch = 'devices' in params
+    # Prefere as janelas pré-agregadas (menos pontos para varrer, picos exatos);
+    # sem janelas no intervalo, cai para as leituras brutas.
+    # last() deixa uma tabela por dispositivo e tamanho de janela: reagrupa e fica com a mais recente
+    # (por dispositivo, em lote)
+    group = 'group(columns: ["device"])' if batch else 'group()'
+    window_query = flux_template('latest_window_devices' if batch else 'latest_window', device_ids,
+                                 lambda device_filter: f'''
+        from(bucket: param_bucket) |> range(start: param_start)
+          |> filter(fn: (r) => r["_measurement"] == "environment_window" and r["_field"] == "current_mean")
+          |> filter(fn: (r) => {window_filter(RANGE_RESOLUTION)})
+          {device_filter}
+          |> last()
+          |> {group}
+          |> sort(columns: ["_time"], desc: true)
+          |> limit(n: 1)
+    ''')
+    raw_query = flux_template('latest_raw_devices' if batch else 'latest_raw', device_ids, lambda device_filter: f'''
+        from(bucket: param_bucket) |> range(start: param_start)
+          |> filter(fn: (r) => r["_measurement"] == "environment")
+          |> filter(fn: (r) => {fields_filter(MEAN_FIELDS + [COUNTER_FIELD])})
+          {device_filter}
+          |> last()
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> {group}
+          |> sort(columns: ["_time"], desc: true)
+          |> limit(n: 1)
+    ''')
+    # As duas consultas são baratas (last()) e rodam juntas: a rota custa a mais lenta, não a soma.
+    # Uma falha só derruba a resposta quando o resultado dela seria usado.
+    results, failures = query_many({'window': window_query, 'raw': raw_query}, org, flux_params)
+    if 'window' in failures:
+        raise QueryFailed(failures['window'])
+    window_results = results['window']
+
+    if batch:
+        results_body = latest_by_device(window_results, lambda r: {"time": r['_time'], "current": r['_value']})
+        # A escolha entre janelas e leituras brutas é por dispositivo: numa frota mista, quem só envia
+        # leituras brutas fica com a leitura bruta ("all" pode ter dispositivos só com brutas)
+        if 'raw' in failures:
+            if not device_ids or any(device not in results_body for device in device_ids):
+                raise QueryFailed(failures['raw'])
+        else:
+            for device, point in latest_by_device(results['raw'], electrical_point).items():
+                results_body.setdefault(device, point)
+        results_body = dict(sorted(results_body.items()))
+    elif window_results:
+        results_body = {"time": window_results[0]['_time'], "current": window_results[0]['_value']}
+    elif 'raw' in failures:
+        raise QueryFailed(failures['raw'])
+    else:
+        raw_results = results['raw']
+        results_body = electrical_point(raw_results[0]) if raw_results else {}  # Retorna vazio se nao achar nada
+    return json.dumps(results_body, default=str)
+
+
+def query_range(params):
+    """Série do intervalo, reduzida a ``max_points`` e no formato negociado."""
+    org, flux_params, device_ids = query_context(params)
+    batch = 'devices' in params
+    # Séries longas: a resposta CSV vira JSON direto, sem FluxRecord nem dict por linha.
+    # A janela cresce com o intervalo e o LTTB limita a série a "max_points" pontos.
+    max_points = params['max_points']
+    resolution = choose_resolution(params['range'].total_seconds(), max_points)
+    since = params.get('since')
+    # Série de um dispositivo no formato colunar sempre leva o cursor, para o cliente passar a buscar
+    # só o que muda (a carga inicial, sem "since", continua indo para o cache)
+    cursor = not batch and params['format'] != 'json'
+    if since is not None:
+        # Busca incremental: refaz a partir do início do bucket RANGE_LATE_MARGIN_SECONDS antes do
+        # cursor (sem voltar além do próprio range). O último bucket, ainda aberto, e os que
+        # receberam leituras atrasadas voltam recalculados com o mesmo timestamp e o cliente
+        # substitui os pontos que já tinha. Um cursor adiantado (relógio do cliente) refaz o último bucket.
+        bucket_ms = RESOLUTIONS[resolution] * 1000
+        restart = (since - RANGE_LATE_MARGIN_SECONDS * 1000) // bucket_ms * bucket_ms
+        now = time.time() * 1000
+        start = min(max(restart, now - params['range'].total_seconds() * 1000), now - bucket_ms)
+        flux_params['param_start'] = datetime.fromtimestamp(start / 1000, tz=timezone.utc)
+    # Cada ponto leva o início do seu bucket (timeSrc "_start"): o fim do bucket aberto seria cortado
+    # no "agora" e mudaria a cada consulta, enquanto o início fica igual até ele fechar.
+    window_query = flux_template(f'range_window_{resolution}', device_ids, lambda device_filter: f'''
+        data = from(bucket: param_bucket) |> range(start: param_start)
+          |> filter(fn: (r) => r["_measurement"] == "environment_window")
+          |> filter(fn: (r) => {window_filter(resolution)})
+          {device_filter}
+          |> drop(columns: ["window"])
+        mean = data |> filter(fn: (r) => r["_field"] == "current_mean")
+          |> aggregateWindow(every: {resolution}, fn: mean, timeSrc: "_start", createEmpty: false)
+        peak = data |> filter(fn: (r) => r["_field"] == "current_max")
+          |> aggregateWindow(every: {resolution}, fn: max, timeSrc: "_start", createEmpty: false)
+        union(tables: [mean, peak])
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> sort(columns: ["_time"])
+    ''')
+    window_columns = ['_time', 'current_mean', 'current_max']
+    window_render = series_renderer(params['format'], ['time', 'current', 'peak'], max_points, peak_index=2,
+                                    since=since, cursor=cursor)
+
+    def raw_query(query_device_ids):
+        return flux_template(f'range_raw_{resolution}', query_device_ids, lambda device_filter: f'''
+            data = from(bucket: param_bucket) |> range(start: param_start)
+              |> filter(fn: (r) => r["_measurement"] == "environment")
+              {device_filter}
+            means = data |> filter(fn: (r) => {fields_filter(MEAN_FIELDS)})
+              |> aggregateWindow(every: {resolution}, fn: mean, timeSrc: "_start", createEmpty: false)
+            counter = data |> filter(fn: (r) => r["_field"] == "{COUNTER_FIELD}")
+              |> aggregateWindow(every: {resolution}, fn: last, timeSrc: "_start", createEmpty: false)
+            peak = data |> filter(fn: (r) => r["_field"] == "current")
+              |> aggregateWindow(every: {resolution}, fn: max, timeSrc: "_start", createEmpty: false)
+              |> set(key: "_field", value: "current_max")
+            union(tables: [means, counter, peak])
+              |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+              |> sort(columns: ["_time"])
+        ''')
+    # Mesmo formato de electrical_point: "current" sempre, os demais campos (e o pico) só quando presentes
+    fields = MEAN_FIELDS + [COUNTER_FIELD]
+    raw_columns = ['_time'] + fields + ['current_max']
+    raw_render = series_renderer(params['format'], ['time'] + fields + ['peak'], max_points,
+                                 peak_index=len(fields) + 1, optional=fields[1:] + ['peak'], since=since, cursor=cursor)
+
+    if not batch:
+        body, count = stream_influx(window_query, org, flux_params, window_columns, window_render)
+        if count:
+            return body
+        body, _ = stream_influx(raw_query(device_ids), org, flux_params, raw_columns, raw_render)
+        return body
+
+    # Em lote o pivot já separa uma tabela por dispositivo; a coluna "device" separa as séries na leitura.
+    # Janelas ou leituras brutas é escolhido por dispositivo, como em "latest".
+    window_groups = stream_influx(window_query, org, flux_params, window_columns + ['device'], group_by_device)
+    series = {device: (window_render, rows) for device, rows in window_groups.items()}
+    missing = [device for device in device_ids if device not in series]
+    if missing or not device_ids:
+        raw_groups = stream_influx(raw_query(missing), org, device_params(flux_params, missing),
+                                   raw_columns + ['device'], group_by_device)
+        for device, rows in raw_groups.items():
+            series.setdefault(device, (raw_render, rows))
+    body, _ = device_series(series, device_ids, raw_render)
+    return body
+
+
+def query_summary(params):
+    """Totais de energia (kWh) de hoje, ontem, mês atual e mês anterior."""
+    org, flux_params, device_ids = query_context(params)
+    # Uma única consulta (uma varredura do bucket longterm) para os quatro totais
+    raw_results = fetch_influx(flux_template('summary', device_ids, summary_query), org, flux_params)
+    totals = summary_totals(raw_results)
+    results_body = {
+        "today": totals.get('today', 0),
+        "month": totals.get('month', totals.get('today', 0)),
+        "yesterday": totals.get('yesterday', 0),
+        "previous_month": totals.get('previous_month', 0)
+    }
+    return json.dumps(results_body, default=str)
+
+
+def query_peak_history(params):
+    """Pico, instante do pico e p95 de corrente por dia, do rollup "pico_diario"."""
+    org, flux_params, device_ids = query_context(params)
+    # Rollup pronto: "limit" dias x dispositivos x ambientes da ingestão, sem tocar nas leituras brutas
+    flux_params['param_start'] = -timedelta(days=params['limit'] + 1)
+    flux_query = flux_template('history_peak', device_ids, lambda device_filter: f'''
+        from(bucket: param_longterm_bucket)
+          |> range(start: param_start)
+          |> filter(fn: (r) => r._measurement == "pico_diario" and r.period == "1d")
+          {device_filter}
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+    ''')
+    results_body = daily_peaks(fetch_influx(flux_query, org, flux_params), params['limit'])
+    return json.dumps(results_body, default=str)
+
+
+def query_history(params):
+    """Energia (kWh) por dia ou por mês."""
+    org, flux_params, device_ids = query_context(params)
+    period = params['period']
+    every = '1d' if period == 'daily' else '1mo'
+    # Diário olha os últimos 30 dias; mensal, o suficiente para "limit" meses
+    flux_params['param_start'] = -timedelta(days=30 if period == 'daily' else params['limit'] * 31)
+    flux_query = flux_template(f'history_{period}', device_ids, lambda device_filter: f'''
+        from(bucket: param_longterm_bucket)
+          |> range(start: param_start)
+          |> filter(fn: (r) => r._measurement == "energia_diaria" and r._field == "kwh_total_diario")
+          {device_filter}
+          |> aggregateWindow(every: {every}, fn: {'last' if period == 'daily' else 'sum'}, createEmpty: false)
+          |> sort(columns: ["_time"], desc: true)
+          |> limit(n: param_limit)
+          |> sort(columns: ["_time"])
+          |> map(fn: (r) => ({{ "x": r._time, "y": r._value }}))
+    ''')
+    integrated_query = flux_template(f'history_{period}_integrated', device_ids, lambda device_filter: f'''
+        {flux_preamble()}
+        {integrated_energy("param_start", device_filter)}
+          |> aggregateWindow(every: {every}, fn: sum, createEmpty: false)
+          |> sort(columns: ["_time"], desc: true)
+          |> limit(n: param_limit)
+          |> sort(columns: ["_time"])
+          |> map(fn: (r) => ({{ "x": r._time, "y": r._value }}))
+    ''')
+    raw_results = fetch_influx(integrated_query, org, flux_params) or fetch_influx(flux_query, org, flux_params)
+    results_body = [{"x": r.get('x'), "y": r.get('y')} for r in raw_results if r.get('x') is not None and r.get('y') is not None]
+    return json.dumps(results_body, default=str)
+
+
+# --- Rotas ---
+# Cada endpoint do frontend é uma função de consulta com TTL de cache e tamanho máximo de resposta
+# próprios. GET /data continua aceitando "type" (e "period" em history) para os clientes antigos.
+MAX_RESPONSE_BYTES = int(os.environ.get('MAX_RESPONSE_BYTES', str(5 * 1024 * 1024)))
+
+
+class Route:
+    def __init__(self, name, query_type, run, ttl, max_bytes, daily=False, fixed=None):
+        self.name = name
+        self.query_type = query_type  # parâmetros aceitos (parse_query_params)
+        self.run = run
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.daily = daily  # agregado por dia: a entrada do cache não atravessa a meia-noite local
+        self.fixed = fixed or {}  # parâmetros definidos pelo caminho
+
+
+ROUTES = {route.name: route for route in (
+    Route('devices', 'devices', query_devices, CACHE_TTLS['devices'], 64 * 1024),
+    Route('latest', 'latest', query_latest, CACHE_TTLS['latest'], 256 * 1024),
+    Route('range', 'range', query_range, CACHE_TTLS['range'], MAX_RESPONSE_BYTES),
+    Route('summary', 'summary', query_summary, CACHE_TTLS['summary'], 4 * 1024, daily=True),
+    Route('history/daily', 'history', query_history, CACHE_TTLS['history'], 64 * 1024, daily=True,
+          fixed={'period': 'daily'}),
+    Route('history/monthly', 'history', query_history, CACHE_TTLS['history'], 64 * 1024, daily=True,
+          fixed={'period': 'monthly'}),
+    Route('history/peak', 'history', query_peak_history, CACHE_TTLS['peak'], 128 * 1024, daily=True,
+          fixed={'period': 'peak'}),
+)}
+
+
+def resolve_route(event, query_params):
+    """Rota pelo caminho (/latest, /history/daily, ...); em /data, pelo parâmetro "type"."""
+    path = (event.get('path') or '/data').strip('/')
+    if path not in ('', 'data'):
+        return ROUTES.get(path)
+    query_type = query_params.get('type', 'range')
+    if query_type == 'history':
+        period = query_params.get('period', 'daily')
+        if period not in HISTORY_PERIODS:
+            raise InvalidQuery(f'Parâmetro "period" deve ser um de: {", ".join(HISTORY_PERIODS)}')
+        return ROUTES[f'history/{period}']
+    return ROUTES.get(query_type) if '/' not in query_type else None
+
+
 # --- Função principal da Lambda ---
 def handler(event, context):
     cors_headers = {
@@ -58,106 +715,69 @@ def handler(event, context):
     }
 
     try:
-        creds = get_influx_credentials()
-        org = creds['org']
-        bucket = creds['bucket']
-        longterm_bucket = f"{bucket}_longterm"
-
         query_params = event.get('queryStringParameters') or {}
-        query_type = query_params.get('type', 'range')
-
-        # --- Lógica de consulta ---
-        device_id = query_params.get('device_id')
-        device_filter = f'|> filter(fn: (r) => r["device"] == "{device_id}")' if device_id else ''
-
-        if query_type == 'devices':
-            flux_query = f'''
-                import "influxdata/influxdb/schema"
-                schema.tagValues(bucket: "{bucket}", tag: "device")
-            '''
-            raw_results = query_influx(flux_query, org)
-            # Extrair apenas os valores das tags
-            results_body = [r.get('_value') for r in raw_results if r.get('_value')]
-
-        elif query_type in ['latest', 'range']:
-            time_range = '-5m' if query_type == 'latest' else query_params.get('range', '-5m')
-            flux_query = f'''
-                from(bucket: "{bucket}") |> range(start: {time_range}) 
-                  |> filter(fn: (r) => r["_measurement"] == "environment" and r["_field"] == "current")
-                  {device_filter}
-                  {"|> last()" if query_type=="latest" else "|> aggregateWindow(every: 10s, fn: mean, createEmpty: false)"}
-            '''
-            raw_results = query_influx(flux_query, org)
-            results_body = (
-                {"time": raw_results[0]['_time'], "current": raw_results[0]['_value']} 
-                if query_type=='latest' and raw_results else
-                ([{"time": r.get('_time'), "current": r.get('_value')} for r in raw_results] if query_type != 'latest' else [])
-            )
-            if query_type == 'latest' and not raw_results:
-                 results_body = {} # Retorna vazio se nao achar nada
-
-        elif query_type == 'summary':
-            # Nota: Para summary/history usando dados agregados 'energia_diaria', 
-            # assumimos que a tag 'device' também foi preservada ou que o bucket longterm tem essa tag.
-            # Se o bucket de longo prazo não tiver tag, o filtro pode não funcionar como esperado.
-            # Vou aplicar o filtro se ele existir.
-            
-            today_query = f'''
-                from(bucket: "{longterm_bucket}") |> range(start: -1d)
-                  |> filter(fn: (r) => r._measurement == "energia_diaria" and r._field == "kwh_total_diario")
-                  {device_filter}
-                  |> last()
-            '''
-            month_query = f'''
-                import "date"
-                month_start = date.truncate(t: now(), unit: 1mo)
-                from(bucket: "{longterm_bucket}") |> range(start: month_start)
-                  |> filter(fn: (r) => r._measurement == "energia_diaria" and r._field == "kwh_total_diario")
-                  {device_filter}
-                  |> sum()
-            '''
-            today_result = query_influx(today_query, org)
-            month_result = query_influx(month_query, org)
-            results_body = {
-                "today": today_result[0]['_value'] if today_result else 0,
-                "month": month_result[0]['_value'] if month_result else (today_result[0]['_value'] if today_result else 0)
-            }
-
-        elif query_type == 'history':
-            period = query_params.get('period', 'daily')
-            limit = int(query_params.get('limit', 7))
-            if period == 'daily':
-                flux_query = f'''
-                    from(bucket: "{longterm_bucket}")
-                      |> range(start: -30d)
-                      |> filter(fn: (r) => r._measurement == "energia_diaria" and r._field == "kwh_total_diario")
-                      {device_filter}
-                      |> aggregateWindow(every: 1d, fn: last, createEmpty: false)
-                      |> sort(columns: ["_time"], desc: true)
-                      |> limit(n: {limit})
-                      |> sort(columns: ["_time"])
-                      |> map(fn: (r) => ({{ "x": r._time, "y": r._value }}))
-                '''
-            else:  # monthly
-                flux_query = f'''
-                    from(bucket: "{longterm_bucket}")
-                      |> range(start: -{limit * 31}d)
-                      |> filter(fn: (r) => r._measurement == "energia_diaria" and r._field == "kwh_total_diario")
-                      {device_filter}
-                      |> aggregateWindow(every: 1mo, fn: sum, createEmpty: false)
-                      |> sort(columns: ["_time"], desc: true)
-                      |> limit(n: {limit})
-                      |> sort(columns: ["_time"])
-                      |> map(fn: (r) => ({{ "x": r._time, "y": r._value }}))
-                '''
-            raw_results = query_influx(flux_query, org)
-            results_body = [{"x": r.get('x'), "y": r.get('y')} for r in raw_results if r.get('x') is not None and r.get('y') is not None]
+        route = resolve_route(event, query_params)
 
-        else:
-            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Tipo de query inválido"})}
+        if route is None:
+            if (event.get('path') or '/data').strip('/') in ('', 'data'):
+                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Tipo de query inválido"})}
+            return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Endpoint não encontrado"})}
 
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(results_body, default=str)}
+        params = parse_query_params(route.query_type, dict(query_params, **route.fixed), event.get('headers'))
+        key = cache_key(route.name, params)
+        cached_body = result_cache.get(key)
+        if cached_body is not None:
+            return {"statusCode": 200, "headers": dict(cors_headers, **{"X-Cache": "HIT"}), "body": cached_body}
 
+        # Requisições idênticas simultâneas em outros ambientes reaproveitam a mesma consulta (COALESCE_DIR);
+        # cursores ("since") são únicos por cliente e não se repetem, então vão direto
+        if 'since' in params:
+            body = route.run(params)
+        else:
+            body = coalescer.do(key, lambda: route.run(params))
+        if len(body) > route.max_bytes:
+            print(f"Resposta de {route.name} com {len(body)} bytes excede {route.max_bytes}")
+            return {"statusCode": 413, "headers": cors_headers,
+                    "body": json.dumps({"error": "Resposta grande demais; reduza o intervalo, max_points, limit ou devices"})}
+        if 'since' not in params:  # cursores são únicos por cliente, não vale guardar
+            result_cache.put(key, body, route.ttl, route.daily)
+        stats = result_cache.snapshot()
+        print(f"Cache: miss {key} (hits={stats['hits']}, misses={stats['misses']})")
+        return {"statusCode": 200, "headers": dict(cors_headers, **{"X-Cache": "MISS"}), "body": body}
+
+    except InvalidQuery as e:
+        return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
+    except QueryFailed as e:
+        # Nada é guardado no cache: a próxima requisição consulta de novo
+        print(f"Erro ao consultar InfluxDB: {e}")
+        return {"statusCode": 502, "headers": cors_headers, "body": json.dumps({"error": "Falha ao consultar o InfluxDB"})}
     except Exception as e:
         print(f"Erro no handler: {e}")
         return {"statusCode": 500, "headers": {"Access-Control-Allow-Origin": "*"}, "body": json.dumps({"error": str(e)})}
+
+
+# --- Bootstrap na fase de init ---
+# Na carga do módulo (init do ambiente da Lambda, antes da primeira invocação) já busca as
+# credenciais, resolve o DNS do InfluxDB e abre a conexão do pool, para a primeira requisição
+# custar o mesmo que as seguintes. Se algo falhar, a requisição refaz o caminho normalmente.
+BOOTSTRAP_ON_INIT = os.environ.get('BOOTSTRAP_ON_INIT', '1') == '1'
+BOOTSTRAP_TIMEOUT_MS = int(os.environ.get('BOOTSTRAP_TIMEOUT_MS', '3000'))
+
+
+def bootstrap():
+    started = time.perf_counter()
+    try:
+        creds = get_influx_credentials()
+        secret_ms = round((time.perf_counter() - started) * 1000, 1)
+        timings = influx_pool.warm_up(influx_url, creds['token'], creds['org'],
+                                      lambda client: client.query_api(), BOOTSTRAP_TIMEOUT_MS)
+    except Exception as e:
+        print(f"Bootstrap: falhou, a primeira requisição conecta ({e})")
+        return None
+    timings = dict(secret_ms=secret_ms, **timings)
+    print(f"Bootstrap: pronto em {(time.perf_counter() - started) * 1000:.0f} ms {timings}")
+    return timings
+
+
+if BOOTSTRAP_ON_INIT:
+    bootstrap()
@@ -0,0 +1,73 @@
+# lambda_read_data/result_cache.py
+#
+# Cache em memória das respostas da Lambda de leitura. Vários navegadores
+# consultando o mesmo dispositivo repetem exatamente as mesmas consultas a
+# cada poucos segundos; dentro do TTL todos recebem a mesma resposta já
+# serializada e o InfluxDB vê uma consulta por TTL, não uma por usuário.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuração ---
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '512'))
+# TTL (s) padrão de cada rota da Lambda de leitura; 0 desativa o cache da rota
+CACHE_TTLS = {
+    'devices': int(os.environ.get('CACHE_TTL_DEVICES', '300')),
+    'latest': int(os.environ.get('CACHE_TTL_LATEST', '3')),
+    'range': int(os.environ.get('CACHE_TTL_RANGE', '10')),
+    'summary': int(os.environ.get('CACHE_TTL_SUMMARY', '60')),
+    'history': int(os.environ.get('CACHE_TTL_HISTORY', '600')),
+    'peak': int(os.environ.get('CACHE_TTL_PEAK', '600')),
+}
+UTC_OFFSET_SECONDS = int(os.environ.get('ENERGY_UTC_OFFSET_MINUTES', '0')) * 60
+
+
+def next_midnight(now):
+    """Próxima meia-noite (epoch s) no fuso ENERGY_UTC_OFFSET_MINUTES."""
+    local = now + UTC_OFFSET_SECONDS
+    return local - local % 86400 + 86400 - UTC_OFFSET_SECONDS
+
+
+class ResultCache:
+    """LRU limitado em ``max_entries`` com expiração por entrada."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.entries = OrderedDict()  # chave -> (expira em, valor)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, value, ttl, daily=False):
+        """Guarda ``value`` por ``ttl`` s; com ``daily`` (agregados por dia) a entrada nunca atravessa
+        a meia-noite local, quando um dia fecha e outro começa."""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        now = time.time()
+        expires = now + ttl
+        if daily:
+            expires = min(expires, next_midnight(now))
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, size=len(self.entries))
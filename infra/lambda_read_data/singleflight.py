@@ -0,0 +1,117 @@
+# lambda_read_data/singleflight.py
+#
+# Coalescência de consultas idênticas e simultâneas ("single-flight") entre
+# ambientes da Lambda. Cada ambiente atende uma invocação por vez, então a
+# concorrência está entre ambientes: com COALESCE_DIR apontando para um
+# diretório compartilhado (volume EFS, montado pelo lambda.tf), o primeiro
+# ambiente de uma chave segura um flock e publica o resultado em disco, e quem
+# esperava pelo lock reaproveita o resultado se ele tiver sido gravado há
+# menos de COALESCE_WINDOW_SECONDS. Sem COALESCE_DIR cada ambiente consulta
+# por conta própria.
+#
+# Os pares <chave>.lock/<chave>.json só valem por alguns segundos: a cada
+# COALESCE_SWEEP_SECONDS o ambiente apaga os que não são tocados há mais de
+# COALESCE_MAX_AGE_SECONDS, para o volume não crescer com chaves que não se
+# repetem. Apagar um lock em uso no máximo faz dois ambientes consultarem.
+
+import fcntl
+import hashlib
+import os
+import time
+
+# --- Configuração ---
+COALESCE_DIR = os.environ.get('COALESCE_DIR', '')
+COALESCE_WINDOW = float(os.environ.get('COALESCE_WINDOW_SECONDS', '2'))
+# Espera máxima pelo líder de outro ambiente antes de consultar por conta própria
+COALESCE_WAIT = float(os.environ.get('COALESCE_WAIT_SECONDS', '10'))
+# Arquivos mais antigos que isso já não servem a ninguém (janela e espera passaram)
+COALESCE_MAX_AGE = float(os.environ.get('COALESCE_MAX_AGE_SECONDS', '60'))
+COALESCE_SWEEP_INTERVAL = float(os.environ.get('COALESCE_SWEEP_SECONDS', '60'))
+_POLL_INTERVAL = 0.02
+
+
+class SingleFlight:
+    def __init__(self, directory=COALESCE_DIR):
+        self.directory = directory
+        self.stats = {'leaders': 0, 'shared_remote': 0, 'swept': 0}
+        self.last_sweep = time.monotonic()
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Coalescência: diretório compartilhado indisponível, consultando sem coalescência: {e}")
+                self.directory = ''
+
+    def do(self, key, fn):
+        """Executa ``fn()`` ou reaproveita o resultado de outro ambiente para a mesma chave; ``fn`` retorna ``str``."""
+        if not self.directory:
+            return self._lead(fn)
+        result = self._shared(key, fn)
+        if time.monotonic() - self.last_sweep >= COALESCE_SWEEP_INTERVAL:
+            self.sweep()
+        return result
+
+    def sweep(self):
+        """Apaga locks, resultados e temporários que não são alterados há mais de ``COALESCE_MAX_AGE``."""
+        self.last_sweep = time.monotonic()
+        horizon = time.time() - COALESCE_MAX_AGE
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            print(f"Coalescência: falha ao listar o diretório compartilhado ({e})")
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < horizon:
+                    os.remove(entry.path)
+                    self.stats['swept'] += 1
+            except OSError:
+                pass  # outro ambiente apagou antes
+
+    def _lead(self, fn):
+        self.stats['leaders'] += 1
+        return fn()
+
+    def _shared(self, key, fn):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        result_path = os.path.join(self.directory, name + '.json')
+        try:
+            fd = os.open(os.path.join(self.directory, name + '.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            print(f"Coalescência: lock indisponível ({e})")
+            return self._lead(fn)
+        try:
+            locked = self._acquire(fd)
+            # Outro ambiente acabou de consultar a mesma chave: reaproveita o resultado publicado
+            if locked:
+                try:
+                    if time.time() - os.stat(result_path).st_mtime < COALESCE_WINDOW:
+                        with open(result_path, encoding='utf-8') as f:
+                            result = f.read()
+                        self.stats['shared_remote'] += 1
+                        return result
+                except OSError:
+                    pass
+            result = self._lead(fn)
+            if locked:
+                temp_path = f'{result_path}.{os.getpid()}.tmp'
+                try:
+                    with open(temp_path, 'w', encoding='utf-8') as f:
+                        f.write(result)
+                    os.replace(temp_path, result_path)
+                except OSError as e:
+                    print(f"Coalescência: falha ao publicar resultado ({e})")
+            return result
+        finally:
+            os.close(fd)  # libera o flock
+
+    def _acquire(self, fd):
+        deadline = time.monotonic() + COALESCE_WAIT
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(_POLL_INTERVAL)
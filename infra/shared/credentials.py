@@ -0,0 +1,182 @@
+# shared/credentials.py
+#
+# Credenciais do InfluxDB (token, org e bucket) guardadas no Secrets Manager.
+# O boto3 só é importado na primeira busca real. Com LOCAL_SECRET_FILE ou
+# LOCAL_SECRET_JSON o segredo vem de um arquivo ou da própria variável, no
+# mesmo formato do SecretString, o que permite rodar handler, bootstrap e
+# benchmarks sem AWS.
+#
+# CredentialCache guarda o segredo por CREDENTIALS_TTL_SECONDS. Vencido, o
+# valor antigo continua servindo enquanto uma thread busca o novo (por até
+# CREDENTIALS_STALE_SECONDS); depois disso a busca é síncrona. Um 401 do
+# InfluxDB (token rotacionado) força uma nova busca e repete a operação uma
+# vez. Falhas na busca esperam CREDENTIALS_RETRY_SECONDS antes de tentar o
+# Secrets Manager de novo, em vez de uma chamada por requisição.
+
+import json
+import os
+import threading
+import time
+
+# --- Configuração ---
+SECRET_ARN = os.environ.get('SECRET_ARN')
+LOCAL_SECRET_FILE = os.environ.get('LOCAL_SECRET_FILE')
+LOCAL_SECRET_JSON = os.environ.get('LOCAL_SECRET_JSON')
+CREDENTIALS_TTL = float(os.environ.get('CREDENTIALS_TTL_SECONDS', '300'))
+CREDENTIALS_STALE = float(os.environ.get('CREDENTIALS_STALE_SECONDS', '3600'))
+CREDENTIALS_RETRY = float(os.environ.get('CREDENTIALS_RETRY_SECONDS', '5'))
+# Intervalo mínimo entre buscas disparadas por 401, para um token inválido não virar uma busca por requisição
+AUTH_REFRESH_MIN = float(os.environ.get('CREDENTIALS_AUTH_REFRESH_SECONDS', '10'))
+AUTH_ERROR_STATUS = 401
+
+_secrets_manager = None
+
+
+def secret_string():
+    global _secrets_manager
+    if LOCAL_SECRET_JSON:
+        return LOCAL_SECRET_JSON
+    if LOCAL_SECRET_FILE:
+        with open(LOCAL_SECRET_FILE, encoding='utf-8') as f:
+            return f.read()
+    if not SECRET_ARN:
+        raise RuntimeError('SECRET_ARN não definido (ou LOCAL_SECRET_FILE/LOCAL_SECRET_JSON para rodar localmente)')
+    if _secrets_manager is None:
+        import boto3
+        _secrets_manager = boto3.client('secretsmanager')
+    return _secrets_manager.get_secret_value(SecretId=SECRET_ARN)['SecretString']
+
+
+def fetch():
+    """Busca o segredo e retorna ``{'token', 'org', 'bucket'}``."""
+    secret_data = json.loads(secret_string())
+    return {
+        'token': secret_data['INFLUXDB_INIT_ADMIN_TOKEN'],
+        'org': secret_data['INFLUXDB_ORG'],
+        'bucket': secret_data['INFLUXDB_BUCKET']
+    }
+
+
+class CredentialCache:
+    """Segredo em memória com TTL, renovação em segundo plano e nova busca após 401."""
+
+    def __init__(self, loader=fetch, ttl=CREDENTIALS_TTL, stale=CREDENTIALS_STALE, retry_after=CREDENTIALS_RETRY,
+                 auth_refresh_min=AUTH_REFRESH_MIN):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale = stale
+        self.retry_after = retry_after
+        self.auth_refresh_min = auth_refresh_min
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # uma busca por vez; quem chega depois usa o resultado
+        self._value = None
+        self._fetched_at = 0.0
+        self._auth_refreshed_at = None
+        self._failed_at = None
+        self._error = None
+        self._background = None
+        self._stats = {'hits': 0, 'stale_hits': 0, 'refreshes': 0, 'background_refreshes': 0,
+                       'refresh_errors': 0, 'rotations': 0, 'auth_retries': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _in_backoff(self, now):
+        return self._failed_at is not None and now - self._failed_at < self.retry_after
+
+    def get(self):
+        """Credenciais atuais; busca no Secrets Manager só se vencidas além da janela de ``stale``."""
+        now = time.monotonic()
+        with self._lock:
+            value = self._value
+            age = now - self._fetched_at
+            if value is not None and age < self.ttl:
+                self._stats['hits'] += 1
+                return value
+            if value is not None and age < self.ttl + self.stale:
+                self._stats['stale_hits'] += 1
+                if self._background is None and not self._in_backoff(now):
+                    # Com o ambiente congelado entre invocações, a thread termina na próxima
+                    self._background = threading.Thread(target=self._refresh_in_background, daemon=True)
+                    self._background.start()
+                return value
+        return self.refresh()
+
+    def refresh(self, stale=None):
+        """Busca síncrona. Com ``stale`` (credenciais recusadas), só busca se ninguém renovou desde então."""
+        with self._refresh_lock:
+            now = time.monotonic()
+            with self._lock:
+                value = self._value
+                if value is not None:
+                    if stale is None and now - self._fetched_at < self.ttl:
+                        return value  # renovado por outra thread enquanto esta esperava
+                    if stale is not None and value['token'] != stale['token']:
+                        return value  # outra thread já trouxe o token novo
+                    if (stale is not None and self._auth_refreshed_at is not None
+                            and now - self._auth_refreshed_at < self.auth_refresh_min):
+                        return value
+                if self._in_backoff(now):
+                    if value is None:
+                        raise self._error
+                    return value
+                if stale is not None:
+                    self._auth_refreshed_at = now
+            return self._load(background=False)
+
+    def _refresh_in_background(self):
+        try:
+            with self._refresh_lock:
+                with self._lock:
+                    due = time.monotonic() - self._fetched_at >= self.ttl
+                if due:
+                    self._load(background=True)
+        except Exception:
+            pass  # já registrado em _load; a próxima leitura vencida tenta de novo
+        finally:
+            with self._lock:
+                self._background = None
+
+    def _load(self, background):
+        try:
+            value = self.loader()
+        except Exception as e:
+            with self._lock:
+                self._failed_at = time.monotonic()
+                self._error = e
+                self._stats['refresh_errors'] += 1
+                current = self._value
+            print(f"Erro ao buscar segredo do Secrets Manager (nova tentativa em {self.retry_after:g}s): {e}")
+            if current is None:
+                raise
+            return current
+        with self._lock:
+            rotated = self._value is not None and value['token'] != self._value['token']
+            self._value = value
+            self._fetched_at = time.monotonic()
+            self._failed_at = self._error = None
+            self._stats['refreshes'] += 1
+            if background:
+                self._stats['background_refreshes'] += 1
+            if rotated:
+                self._stats['rotations'] += 1
+        if rotated:
+            print(f"Credenciais: token do InfluxDB rotacionado {self.stats()}")
+        return value
+
+    def call(self, fn, creds=None):
+        """Executa ``fn(creds)``; se o InfluxDB responder 401, busca o segredo de novo e tenta mais uma vez."""
+        creds = creds if creds is not None else self.get()
+        try:
+            return fn(creds)
+        except Exception as e:
+            if getattr(e, 'status', None) != AUTH_ERROR_STATUS:
+                raise
+            with self._lock:
+                self._stats['auth_retries'] += 1
+            fresh = self.refresh(stale=creds)
+            if fresh['token'] == creds['token']:
+                raise e
+            print(f"InfluxDB respondeu 401: repetindo com o segredo renovado {self.stats()}")
+            return fn(fresh)
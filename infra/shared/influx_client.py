@@ -0,0 +1,55 @@
+# shared/influx_client.py
+#
+# Cliente InfluxDB enxuto para a Lambda. O InfluxDBClient do pacote importa
+# todas as APIs (buckets, tasks, delete, invokable scripts...) e o WriteApi
+# traz o reactivex para o modo em lote, que a Lambda não usa: ~0,5 s a mais no
+# cold start. Aqui só entram o ApiClient, a consulta (QueryApi) e a escrita
+# síncrona de line protocol direto no WriteService; os modelos de domínio são
+# importados quando usados (ver infra/build_lambdas.py).
+
+from influxdb_client.client._base import _BaseClient
+
+
+class LeanWriteApi:
+    """Escrita síncrona de line protocol já serializado (bytes ou str)."""
+
+    def __init__(self, client):
+        from influxdb_client.service.write_service import WriteService
+        self._write_service = WriteService(client.api_client)
+
+    def write(self, bucket, org, record, write_precision='ns'):
+        return self._write_service.post_write(org=org, bucket=bucket, body=record, precision=write_precision,
+                                              async_req=False, content_type="text/plain; charset=utf-8")
+
+
+class LeanInfluxDBClient(_BaseClient):
+    """Mesma configuração e transporte do InfluxDBClient, só com as APIs de escrita e consulta."""
+
+    def __init__(self, url, token, org=None, timeout=10_000, **kwargs):
+        super().__init__(url=url, token=token, org=org, timeout=timeout, http_client_logger="urllib3", **kwargs)
+        from influxdb_client._sync.api_client import ApiClient
+        self.api_client = ApiClient(configuration=self.conf, header_name=self.auth_header_name,
+                                    header_value=self.auth_header_value, retries=self.retries)
+
+    def query_api(self, query_options=None):
+        from influxdb_client.client.query_api import QueryApi, QueryOptions
+        return QueryApi(self, query_options if query_options is not None else QueryOptions())
+
+    def write_api(self):
+        return LeanWriteApi(self)
+
+    def ping(self, timeout=None):
+        """GET /ping (sem autenticação); levanta exceção se o InfluxDB não responder."""
+        from influxdb_client.service.ping_service import PingService
+        PingService(self.api_client).get_ping(_request_timeout=timeout)
+
+    def close(self):
+        if self.api_client:
+            self.api_client.__del__()
+            self.api_client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
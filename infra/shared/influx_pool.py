@@ -0,0 +1,111 @@
+# shared/influx_pool.py
+#
+# Mantém um único cliente InfluxDB (e o PoolManager do urllib3 por baixo dele)
+# vivo entre invocações "quentes" da Lambda, preservando o keep-alive TCP.
+# O cliente é o LeanInfluxDBClient (influx_client.py), que não importa as APIs
+# que a Lambda não usa.
+
+import socket
+import threading
+import time
+import urllib3
+from influx_client import LeanInfluxDBClient
+
+# Erros de transporte que indicam conexão quebrada: o cliente é descartado e recriado
+CONNECTION_ERRORS = (urllib3.exceptions.HTTPError, ConnectionError)
+
+_lock = threading.Lock()
+_client = None
+_client_key = None
+_write_api = None
+_stats = {'hits': 0, 'misses': 0, 'rebuilds': 0}
+
+
+def stats():
+    """Contadores de reaproveitamento: ``misses`` = conexões frias pagas."""
+    return dict(_stats)
+
+
+def _close_current():
+    global _client, _client_key, _write_api
+    client = _client
+    _client, _client_key, _write_api = None, None, None
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Erro ao fechar cliente InfluxDB: {e}")
+
+
+def get_client(url, token, org):
+    """Retorna o cliente compartilhado; recria se URL/token/org mudaram (rotação de credenciais)."""
+    global _client, _client_key
+    key = (url, token, org)
+    with _lock:
+        if _client is not None and _client_key == key:
+            _stats['hits'] += 1
+            return _client
+        if _client is not None:
+            _stats['rebuilds'] += 1
+            _close_current()
+        _stats['misses'] += 1
+        _client = LeanInfluxDBClient(url=url, token=token, org=org)
+        _client_key = key
+        print(f"InfluxDB: nova conexão criada {stats()}")
+        return _client
+
+
+def write_api_for(client):
+    """Escrita síncrona reaproveitada enquanto ``client`` for o cliente compartilhado."""
+    global _write_api
+    with _lock:
+        if client is not _client:
+            return client.write_api()
+        if _write_api is None:
+            _write_api = client.write_api()
+        return _write_api
+
+
+def invalidate(reason=None):
+    """Descarta o cliente atual; a próxima chamada abre uma conexão nova."""
+    with _lock:
+        if _client is not None:
+            print(f"InfluxDB: descartando conexão ({reason})")
+            _stats['rebuilds'] += 1
+            _close_current()
+
+
+def call_with_retry(url, token, org, fn):
+    """Executa ``fn(client)``; em falha de conexão recria o cliente e tenta mais uma vez."""
+    client = get_client(url, token, org)
+    try:
+        return fn(client)
+    except CONNECTION_ERRORS as e:
+        invalidate(e)
+        return fn(get_client(url, token, org))
+
+
+def warm_up(url, token, org, prepare=None, timeout_ms=3000):
+    """Deixa o cliente compartilhado pronto antes da primeira requisição (fase de init da Lambda).
+
+    Resolve o DNS do InfluxDB, abre uma conexão keep-alive no pool (GET /ping, sem autenticação)
+    e chama ``prepare(client)`` para carregar os módulos da consulta/escrita. Retorna a duração
+    de cada etapa em ms.
+    """
+    timings = {}
+    started = time.perf_counter()
+    parsed = urllib3.util.parse_url(url)
+    socket.getaddrinfo(parsed.host, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                       type=socket.SOCK_STREAM)
+    timings['dns_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    client = get_client(url, token, org)
+    client.ping(timeout=timeout_ms)
+    timings['connect_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    if prepare is not None:
+        started = time.perf_counter()
+        prepare(client)
+        timings['prepare_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
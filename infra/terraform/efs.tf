@@ -29,6 +29,29 @@ resource "aws_efs_access_point" "influxdb" {
   }
 }
 
+# Access Point para a coalescência de consultas da Lambda de leitura (COALESCE_DIR)
+resource "aws_efs_access_point" "lambda_coalesce" {
+  file_system_id = aws_efs_file_system.influxdb_data.id
+
+  posix_user {
+    uid = 1001
+    gid = 1001
+  }
+
+  root_directory {
+    path = "/lambda-coalesce"
+    creation_info {
+      owner_uid   = 1001
+      owner_gid   = 1001
+      permissions = "0750"
+    }
+  }
+
+  tags = {
+    Name = "${var.project_name}-lambda-coalesce-ap"
+  }
+}
+
 # Mount Targets do EFS nas subnets privadas
 resource "aws_efs_mount_target" "mount_private_a" {
   file_system_id  = aws_efs_file_system.influxdb_data.id
@@ -56,3 +79,13 @@ resource "aws_security_group" "efs" {
     cidr_blocks = ["0.0.0.0/0"]
   }
 }
+
+# Regra de segurança: Lambdas -> EFS (volume de coalescência)
+resource "aws_security_group_rule" "lambda_to_efs" {
+  type                     = "ingress"
+  from_port                = 2049
+  to_port                  = 2049
+  protocol                 = "tcp"
+  source_security_group_id = aws_security_group.lambda.id
+  security_group_id        = aws_security_group.efs.id
+}
@@ -34,6 +34,12 @@ resource "aws_iam_role_policy_attachment" "lambda_policy" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
 }
 
+# Montagem do EFS pela Lambda de leitura (coalescência de consultas)
+resource "aws_iam_role_policy_attachment" "lambda_efs" {
+  role       = aws_iam_role.lambda_role.name
+  policy_arn = "arn:aws:iam::aws:policy/AmazonElasticFileSystemClientReadWriteAccess"
+}
+
 # Policy para ler segredo do InfluxDB
 resource "aws_iam_policy" "read_influxdb_secret" {
   name        = "${var.project_name}-ReadInfluxDBSecretPolicy"
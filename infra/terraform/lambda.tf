@@ -3,7 +3,7 @@
 # Data ingestor Lambda (.zip)
 data "archive_file" "lambda_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/../lambda_function"
+  source_dir  = "${path.module}/../build/lambda_function" # gerado por infra/build_lambdas.py
   output_path = "${path.module}/../lambda_function.zip"
 }
 
@@ -32,7 +32,7 @@ resource "aws_lambda_function" "data_ingestor" {
 # Read data Lambda (.zip)
 data "archive_file" "lambda_read_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/../lambda_read_data"
+  source_dir  = "${path.module}/../build/lambda_read_data" # gerado por infra/build_lambdas.py
   output_path = "${path.module}/../lambda_read_data.zip"
 }
 
@@ -50,12 +50,26 @@ resource "aws_lambda_function" "read_data" {
     security_group_ids = [aws_security_group.lambda.id]
   }
 
+  # Diretório compartilhado entre ambientes: requisições idênticas simultâneas fazem uma consulta só
+  file_system_config {
+    arn              = aws_efs_access_point.lambda_coalesce.arn
+    local_mount_path = "/mnt/coalesce"
+  }
+
   environment {
     variables = {
       INFLUXDB_URL = "http://influxdb.wiresense.local:8086"
       SECRET_ARN   = aws_secretsmanager_secret.influxdb_creds.arn
+      COALESCE_DIR = "/mnt/coalesce"
     }
   }
+
+  depends_on = [
+    aws_efs_mount_target.mount_private_a,
+    aws_efs_mount_target.mount_private_b,
+    aws_security_group_rule.lambda_to_efs,
+    aws_iam_role_policy_attachment.lambda_efs,
+  ]
 }
 
 # Security Group para Lambdas
@@ -77,6 +91,9 @@ resource "aws_security_group" "lambda" {
 resource "aws_api_gateway_rest_api" "wiresense_api" {
   name        = "${var.project_name}-api"
   description = "API para receber e fornecer os dados do IoT"
+
+  # Frames binários do ESP32 chegam à Lambda em base64 (isBase64Encoded)
+  binary_media_types = ["application/vnd.wiresense.frame", "application/octet-stream"]
 }
 
 # Recurso /data
@@ -122,6 +139,30 @@ resource "aws_api_gateway_integration" "lambda_read_integration" {
   uri                     = aws_lambda_function.read_data.invoke_arn
 }
 
+# Demais caminhos de leitura (/latest, /summary, /history/daily, ...): a Lambda de leitura roteia pelo caminho
+resource "aws_api_gateway_resource" "read_proxy_resource" {
+  rest_api_id = aws_api_gateway_rest_api.wiresense_api.id
+  parent_id   = aws_api_gateway_rest_api.wiresense_api.root_resource_id
+  path_part   = "{proxy+}"
+}
+
+resource "aws_api_gateway_method" "read_proxy_get_method" {
+  rest_api_id      = aws_api_gateway_rest_api.wiresense_api.id
+  resource_id      = aws_api_gateway_resource.read_proxy_resource.id
+  http_method      = "GET"
+  authorization    = "NONE"
+  api_key_required = false
+}
+
+resource "aws_api_gateway_integration" "lambda_read_proxy_integration" {
+  rest_api_id             = aws_api_gateway_rest_api.wiresense_api.id
+  resource_id             = aws_api_gateway_resource.read_proxy_resource.id
+  http_method             = aws_api_gateway_method.read_proxy_get_method.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.read_data.invoke_arn
+}
+
 # OPTIONS method (CORS)
 resource "aws_api_gateway_method" "cors_options_method" {
   rest_api_id   = aws_api_gateway_rest_api.wiresense_api.id
@@ -193,12 +234,16 @@ resource "aws_api_gateway_deployment" "main" {
 
   triggers = {
     redeployment = sha1(jsonencode([
+      aws_api_gateway_rest_api.wiresense_api.binary_media_types,
       aws_api_gateway_resource.data_resource.id,
       aws_api_gateway_method.post_method.id,
       aws_api_gateway_method.get_method.id,
       aws_api_gateway_method.cors_options_method.id,
       aws_api_gateway_integration.lambda_integration.id,
       aws_api_gateway_integration.lambda_read_integration.id,
+      aws_api_gateway_resource.read_proxy_resource.id,
+      aws_api_gateway_method.read_proxy_get_method.id,
+      aws_api_gateway_integration.lambda_read_proxy_integration.id,
       aws_api_gateway_integration.cors_options_integration.id,
       aws_api_gateway_integration_response.cors_options_integration_response.id,
     ]))
@@ -0,0 +1,11 @@
+# tests/conftest.py
+#
+# Os módulos das Lambdas são importados como no runtime: cada diretório (com
+# as dependências vendorizadas) e infra/shared no sys.path.
+
+import os
+import sys
+
+INFRA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for name in ('shared', 'lambda_read_data', 'lambda_function'):
+    sys.path.insert(0, os.path.join(INFRA_DIR, name))
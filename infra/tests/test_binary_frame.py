@@ -0,0 +1,111 @@
+import math
+import struct
+import time
+import zlib
+
+import pytest
+
+import binary_frame
+from binary_frame import (ENCODING_DELTA_VARINT, ENCODING_FLOAT32, ENCODING_INT16, decode, encode_frame,
+                          parse_frames)
+from readings import InvalidPayload
+
+NOW_MS = int(time.time() * 1000)
+SAMPLES = [0.0, 1.5, -2.25, 3.125, 10.0, -0.001]
+
+
+def with_crc(frame_without_crc):
+    return frame_without_crc + struct.pack('<I', zlib.crc32(frame_without_crc))
+
+
+@pytest.mark.parametrize('encoding', [ENCODING_FLOAT32, ENCODING_INT16, ENCODING_DELTA_VARINT])
+def test_round_trip(encoding):
+    data = encode_frame('esp32-01', NOW_MS, 1500, SAMPLES, encoding=encoding)
+    payload, precision, count, frames = decode(data)
+    assert count == len(SAMPLES)
+    assert precision == 'us'
+    assert frames[0].values() == pytest.approx(SAMPLES, abs=1e-3)
+    lines = payload.decode().split('\n')
+    assert len(lines) == len(SAMPLES)
+    assert lines[0] == f'environment,device=esp32-01 current=0 {NOW_MS * 1000}'
+    assert lines[-1].endswith(f' {NOW_MS * 1000 + 7500}')
+
+
+def test_concatenated_frames_and_ms_precision():
+    data = (encode_frame('a', NOW_MS, 10_000, [1.0, 2.0])
+            + encode_frame('b', NOW_MS, 20_000, [3.0], encoding=ENCODING_INT16))
+    payload, precision, count, frames = decode(data)
+    assert [frame.device for frame in frames] == ['a', 'b']
+    assert (precision, count) == ('ms', 3)
+    assert payload.decode().split('\n')[1] == f'environment,device=a current=2 {NOW_MS + 10}'
+
+
+def test_bad_crc():
+    data = bytearray(encode_frame('esp32-01', NOW_MS, 1000, SAMPLES))
+    data[-5] ^= 0xFF
+    with pytest.raises(InvalidPayload, match='CRC'):
+        parse_frames(bytes(data))
+
+
+@pytest.mark.parametrize('cut', [1, 5, 30])
+def test_truncated_frame(cut):
+    data = encode_frame('esp32-01', NOW_MS, 1000, SAMPLES)
+    with pytest.raises(InvalidPayload, match='truncado'):
+        parse_frames(data[:-cut])
+
+
+def test_truncated_varint():
+    frame = bytearray(encode_frame('esp32-01', NOW_MS, 1000, SAMPLES, encoding=ENCODING_DELTA_VARINT)[:-4])
+    frame[-1] |= 0x80  # a última amostra fica sem o byte final
+    with pytest.raises(InvalidPayload, match='truncado'):
+        parse_frames(with_crc(bytes(frame)))
+
+
+def test_varint_count_mismatch():
+    # Varints a mais ou a menos que "count"
+    with pytest.raises(InvalidPayload, match='corrompidas'):
+        binary_frame._decode_deltas(memoryview(b'\x02\x04\x06'), 2)
+    with pytest.raises(InvalidPayload, match='corrompidas'):
+        binary_frame._decode_deltas(memoryview(b'\x02\x84'), 2)
+
+
+def test_zero_interval_rejected_with_frame_index():
+    data = encode_frame('a', NOW_MS, 1000, [1.0]) + encode_frame('b', NOW_MS, 0, [1.0, 2.0])
+    with pytest.raises(InvalidPayload, match='Frame 1: intervalo zero'):
+        parse_frames(data)
+
+
+def test_zero_interval_single_sample_accepted():
+    _, _, count, _ = decode(encode_frame('a', NOW_MS, 0, [1.0]))
+    assert count == 1
+
+
+@pytest.mark.parametrize('scale', [math.nan, math.inf])
+def test_non_finite_scale_rejected(scale):
+    with pytest.raises(InvalidPayload, match='Frame 0: escala'):
+        parse_frames(encode_frame('a', NOW_MS, 1000, [1.0, 2.0], scale=scale))
+
+
+def test_non_finite_sample_rejected():
+    with pytest.raises(InvalidPayload, match='Frame 0: amostras'):
+        parse_frames(encode_frame('a', NOW_MS, 1000, [1.0, math.nan]))
+
+
+def test_bad_magic_version_and_device():
+    data = encode_frame('a', NOW_MS, 1000, [1.0])
+    with pytest.raises(InvalidPayload, match='marcador'):
+        parse_frames(with_crc(b'XX' + data[2:-4]))
+    with pytest.raises(InvalidPayload, match='Versão'):
+        parse_frames(with_crc(data[:2] + b'\x02' + data[3:-4]))
+    with pytest.raises(InvalidPayload, match='device id'):
+        parse_frames(encode_frame('a b', NOW_MS, 1000, [1.0]))
+
+
+def test_timestamps_outside_window():
+    with pytest.raises(InvalidPayload, match='fora da janela'):
+        decode(encode_frame('a', 1000, 1000, [1.0]))
+
+
+def test_empty_body():
+    with pytest.raises(InvalidPayload, match='Nenhuma leitura'):
+        parse_frames(encode_frame('a', NOW_MS, 1000, []))
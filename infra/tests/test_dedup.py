@@ -0,0 +1,61 @@
+from dedup import BloomFilter, Deduplicator
+
+
+def test_record_and_seen(tmp_path):
+    dedup = Deduplicator(str(tmp_path), lru_size=10, capacity=100, error_rate=1e-6)
+    assert not dedup.seen('k1')
+    dedup.record('k1')
+    assert dedup.seen('k1')
+    assert dedup.stats['lru_hits'] == 1
+
+
+def test_bloom_catches_keys_evicted_from_lru(tmp_path):
+    dedup = Deduplicator(str(tmp_path), lru_size=1, capacity=100, error_rate=1e-6)
+    dedup.record('k1')
+    dedup.record('k2')
+    assert list(dedup.lru) == [b'k2']
+    assert dedup.seen('k1')
+    assert dedup.stats['bloom_hits'] == 1
+
+
+def test_bloom_survives_restart(tmp_path):
+    Deduplicator(str(tmp_path), lru_size=1, capacity=100, error_rate=1e-6).record('k1')
+    assert Deduplicator(str(tmp_path), lru_size=1, capacity=100, error_rate=1e-6).seen('k1')
+
+
+def test_generations_rotate_when_full(tmp_path):
+    dedup = Deduplicator(str(tmp_path), lru_size=1, capacity=2, error_rate=1e-6)
+    for key in ('a', 'b', 'c', 'd', 'e'):
+        dedup.record(key)
+    # "a" e "b" encheram a primeira geração, "c" e "d" a segunda; "e" reciclou a primeira
+    assert [bloom.generation for bloom in dedup.blooms] == [2, 1]
+    assert [bloom.count for bloom in dedup.blooms] == [1, 2]
+    assert dedup.seen('c') and dedup.seen('d')
+    assert not dedup.seen('a')
+
+
+def test_is_single_through_lru_and_bloom(tmp_path):
+    dedup = Deduplicator(str(tmp_path), lru_size=1, capacity=100, error_rate=1e-6)
+    dedup.record('single', single=True)
+    assert dedup.is_single('single')
+    dedup.record('batch')
+    assert not dedup.is_single('batch')
+    # "single" saiu do LRU; o marcador no filtro preserva o formato
+    assert dedup.is_single('single')
+    assert not dedup.is_single('unknown')
+
+
+def test_memory_only_without_disk(tmp_path):
+    blocked = tmp_path / 'file'
+    blocked.write_bytes(b'')
+    dedup = Deduplicator(str(blocked / 'dedup'), lru_size=10, capacity=100, error_rate=1e-6)
+    assert dedup.blooms == []
+    dedup.record('k1', single=True)
+    assert dedup.seen('k1') and dedup.is_single('k1')
+
+
+def test_bloom_filter_resizes_file(tmp_path):
+    path = str(tmp_path / 'bloom.bin')
+    BloomFilter(path, 10, 0.01).add(b'k')
+    bloom = BloomFilter(path, 1000, 0.01)
+    assert bloom.count == 0 and b'k' not in bloom
@@ -0,0 +1,74 @@
+import json
+
+from downsample import choose_resolution, downsample, lttb
+from flux_csv import rfc3339_ms, write_columnar, write_json
+
+
+def ts(second):
+    return f'2024-01-01T00:{second // 60:02d}:{second % 60:02d}Z'
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    xs = list(range(100))
+    ys = [(x % 7) * 1.0 for x in xs]
+    selected, bounds = lttb(xs, ys, 10)
+    assert len(selected) == len(bounds) == 10
+    assert selected[0] == 0 and selected[-1] == 99
+    assert selected == sorted(selected)
+    assert all(start <= index < end for index, (start, end) in zip(selected, bounds))
+
+
+def test_lttb_picks_spike():
+    ys = [0.0] * 50
+    ys[23] = 100.0
+    selected, _ = lttb(list(range(50)), ys, 5)
+    assert 23 in selected
+
+
+def test_downsample_short_series_untouched():
+    rows = [(ts(i), str(i)) for i in range(5)]
+    assert downsample(rows, 10) == rows
+
+
+def test_downsample_drops_non_numeric_rows():
+    rows = [(ts(i), 'NaN' if i % 2 else '1') for i in range(10)]
+    assert downsample(rows, 5) == [row for row in rows if row[1] == '1']
+
+
+def test_downsample_keeps_bucket_peak():
+    rows = [(ts(i), '1', '5' if i == 37 else '1') for i in range(100)]
+    result = downsample(rows, 10, peak_index=2)
+    assert len(result) == 10
+    assert [row[2] for row in result].count('5') == 1
+
+
+def test_choose_resolution():
+    assert choose_resolution(3600, 1000) == '10s'
+    assert choose_resolution(30 * 86400, 500) == '1h'
+    assert choose_resolution(10 ** 9, 10) == '1d'
+
+
+def test_rfc3339_ms():
+    assert rfc3339_ms('2024-01-01T00:00:10Z') == 1704067210000
+    assert rfc3339_ms('2024-01-01T00:00:10.5Z') == 1704067210500
+    assert rfc3339_ms('2024-01-01T00:00:10.123456789Z') == 1704067210123
+
+
+def test_write_columnar_delta():
+    rows = [(ts(0), '1.5', ''), (ts(10), 'NaN', '3'), (ts(25), '2', '')]
+    text, count = write_columnar(rows, ('time', 'current', 'peak'), delta=True)
+    assert count == 3
+    assert json.loads(text) == {'t': [1704067200000, 10000, 15000], 'v': [1.5, None, 2],
+                                'peak': [None, 3, None], 'delta': True}
+
+
+def test_write_columnar_omits_empty_extra_columns():
+    text, _ = write_columnar([(ts(0), '1', '')], ('time', 'current', 'peak'))
+    assert json.loads(text) == {'t': [1704067200000], 'v': [1]}
+
+
+def test_write_json_matches_json_dumps():
+    rows = [(ts(0), '1.5', ''), (ts(1), '+Inf', '2')]
+    text, count = write_json(rows, ('time', 'current', 'peak'), optional=('peak',))
+    assert count == 2
+    assert text == json.dumps([{'time': ts(0), 'current': 1.5}, {'time': ts(1), 'current': None, 'peak': 2}])
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from line_protocol import UNTIMED_DUPLICATE, csv_to_line_protocol, scan
+from readings import InvalidPayload
+
+NOW_MS = int(time.time() * 1000)
+
+
+def scan_errors(data, precision='ms'):
+    with pytest.raises(InvalidPayload) as info:
+        scan(data, precision)
+    return info.value.errors
+
+
+def test_scan_counts_valid_lines():
+    data = (f'environment,device=a current=1.5 {NOW_MS}\n'
+            f'# comentário\n'
+            f'\n'
+            f'environment,device=b current=-2,voltage=220.1,power=1e3 {NOW_MS}\r\n'
+            f'environment,device=a current=.5').encode()
+    assert scan(data, 'ms') == 3
+
+
+@pytest.mark.parametrize('line', [
+    rb'environment,device=a\ b current=1',     # espaço escapado no device
+    rb'environment,device=a\,b current=1',     # vírgula escapada no device
+    rb'environment,device=a\=b current=1',     # igual escapado no device
+    b'environment,device="a" current=1',       # tag entre aspas
+    b'environment,device=a current="1"',       # campo string
+    b'environment,device=a current=1i',        # campo inteiro
+    b'environment,device=a current=true',      # campo booleano
+    rb'environment\ x,device=a current=1',     # measurement com escape
+    b'environment,device=a,site=b current=1',  # tag desconhecida
+    b'environment,device=a temperature=1',     # campo desconhecido
+    b'environment current=1',                  # sem device
+    b'other,device=a current=1',               # measurement errada
+    b'environment,device=a current=1 1 2',     # lixo depois do timestamp
+])
+def test_scan_rejects_outside_strict_subset(line):
+    assert scan_errors(line) == [{'line': 1, 'error': 'Linha fora do formato aceito'}]
+
+
+def test_scan_reports_line_numbers_and_timestamp_window():
+    data = f'environment,device=a current=1 {NOW_MS}\nenvironment,device=a current=1 1000\n'.encode()
+    assert scan_errors(data) == [{'line': 2, 'error': 'Timestamp fora da janela aceita'}]
+    # Na precisão errada o mesmo timestamp fica fora da janela
+    assert scan_errors(f'environment,device=a current=1 {NOW_MS}'.encode(), 's')[0]['line'] == 1
+
+
+def test_scan_rejects_untimed_duplicates_per_device():
+    data = b'environment,device=a current=1\nenvironment,device=b current=1\nenvironment,device=a current=2'
+    assert scan_errors(data) == [{'line': 3, 'error': UNTIMED_DUPLICATE}]
+    timed = f'environment,device=a current=1\nenvironment,device=a current=2 {NOW_MS}'.encode()
+    assert scan(timed, 'ms') == 2
+
+
+def test_scan_empty_payload():
+    with pytest.raises(InvalidPayload, match='Nenhuma leitura'):
+        scan(b'\n# apenas comentario\n', 'ms')
+
+
+def test_csv_default_columns():
+    payload, count = csv_to_line_protocol(f'a,{NOW_MS},1.5\nb,,2\n'.encode(), 'ms')
+    assert count == 2
+    assert payload == f'environment,device=a current=1.5 {NOW_MS}\nenvironment,device=b current=2'.encode()
+    assert scan(payload, 'ms') == 2
+
+
+def test_csv_header_reorders_columns():
+    data = f'timestamp,current,device,voltage\n{NOW_MS},1,a,220\n'.encode()
+    payload, count = csv_to_line_protocol(data, 'ms')
+    assert (payload, count) == (f'environment,device=a current=1,voltage=220 {NOW_MS}'.encode(), 1)
+
+
+@pytest.mark.parametrize('data, error', [
+    (b'a,,x', '"current" deve ser numérico'),
+    (b'a,,1,2', 'Número de colunas incorreto'),
+    (b'a b,,1', '"device" inválido'),
+    (b'a,12x,1', 'Timestamp inválido'),
+    (b'a,1000,1', 'Timestamp fora da janela aceita'),
+    (b'a,,1\na,,2', UNTIMED_DUPLICATE),
+])
+def test_csv_rejects(data, error):
+    with pytest.raises(InvalidPayload) as info:
+        csv_to_line_protocol(data, 'ms')
+    assert info.value.errors[-1]['error'] == error
+
+
+def test_csv_invalid_header():
+    with pytest.raises(InvalidPayload, match='Cabeçalho CSV inválido'):
+        csv_to_line_protocol(b'device,timestamp,temperature\na,1,1', 'ms')
@@ -0,0 +1,107 @@
+import math
+import time
+
+import pytest
+
+from readings import MAX_REPORTED_ERRORS, InvalidPayload, choose_precision, parse_timestamp, validate
+
+NOW_S = int(time.time())
+
+
+@pytest.mark.parametrize('value, expected', [
+    (10 ** 11 - 1, (10 ** 11 - 1) * 10 ** 9),  # maior epoch em s
+    (10 ** 11, 10 ** 11 * 10 ** 6),            # menor epoch em ms
+    (10 ** 14 - 1, (10 ** 14 - 1) * 10 ** 6),
+    (10 ** 14, 10 ** 14 * 10 ** 3),            # us
+    (10 ** 17 - 1, (10 ** 17 - 1) * 10 ** 3),
+    (10 ** 17, 10 ** 17),                      # ns
+    (1, 10 ** 9),
+])
+def test_epoch_unit_boundaries(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+def test_float_epoch_is_exact():
+    assert parse_timestamp(1700000000.123) == 1700000000123000000
+    assert parse_timestamp(1700000000123.456) == 1700000000123456000
+
+
+def test_explicit_unit():
+    assert parse_timestamp(1700000000, 'ms') == 1700000000 * 10 ** 6
+    with pytest.raises(ValueError, match='"precision"'):
+        parse_timestamp(1700000000, 'h')
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2023-11-14T22:13:20Z', 1700000000 * 10 ** 9),
+    ('2023-11-14t22:13:20z', 1700000000 * 10 ** 9),
+    ('2023-11-14 22:13:20Z', 1700000000 * 10 ** 9),
+    ('2023-11-14T22:13:20.5Z', 1700000000 * 10 ** 9 + 500000000),
+    ('2023-11-14T22:13:20.123456789Z', 1700000000 * 10 ** 9 + 123456789),
+    ('2023-11-14T19:13:20-03:00', 1700000000 * 10 ** 9),
+    ('2023-11-15T00:43:20.001+02:30', 1700000000 * 10 ** 9 + 1000000),
+    (' 2023-11-14T22:13:20Z ', 1700000000 * 10 ** 9),
+])
+def test_rfc3339(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    '2023-11-14T22:13:20',              # sem fuso
+    '2023-11-14T22:13:20.1234567890Z',  # fração com mais de 9 dígitos
+    '2023-11-14',
+    '1700000000',
+])
+def test_rfc3339_rejected(value):
+    with pytest.raises(ValueError, match='RFC3339'):
+        parse_timestamp(value)
+
+
+@pytest.mark.parametrize('value', [True, False, None, [1], {'t': 1}])
+def test_non_numeric_rejected(value):
+    with pytest.raises(ValueError, match='epoch'):
+        parse_timestamp(value)
+
+
+@pytest.mark.parametrize('value', [0, -1, -1.5, math.nan, math.inf, -math.inf])
+def test_non_positive_or_non_finite_rejected(value):
+    with pytest.raises(ValueError, match='positivo'):
+        parse_timestamp(value)
+
+
+def test_choose_precision():
+    assert choose_precision([NOW_S * 10 ** 9]) == 's'
+    assert choose_precision([NOW_S * 10 ** 9, NOW_S * 10 ** 9 + 10 ** 6]) == 'ms'
+    assert choose_precision([NOW_S * 10 ** 9 + 1000]) == 'us'
+    assert choose_precision([NOW_S * 10 ** 9 + 1]) == 'ns'
+
+
+def test_validate_accepts_readings_and_windows():
+    readings = [{'device_id': 'a', 'current': 1.5, 'timestamp': NOW_S}, {'current': '2', 'timestamp': NOW_S + 1}]
+    windows = [{'start': NOW_S * 1000, 'duration_ms': 1000, 'count': 10, 'min': 1, 'max': 3, 'mean': 2}]
+    reading_records, window_records = validate(readings, 'dev', windows)
+    assert reading_records == [('a', {'current': 1.5}, NOW_S * 10 ** 9),
+                               ('dev', {'current': 2.0}, (NOW_S + 1) * 10 ** 9)]
+    assert window_records[0][:2] == ('dev', '1s')
+
+
+def test_validate_rejects_untimed_duplicates():
+    with pytest.raises(InvalidPayload) as info:
+        validate([{'current': 1}, {'current': 2}, {'device_id': 'b', 'current': 3}], 'a')
+    assert [error['index'] for error in info.value.errors] == [1]
+
+
+def test_validate_rejects_out_of_window_timestamp():
+    with pytest.raises(InvalidPayload) as info:
+        validate([{'current': 1, 'timestamp': 1000}], 'a')
+    assert 'fora da janela' in info.value.errors[0]['error']
+
+
+def test_error_cap_spans_readings_and_windows():
+    readings = [{'current': None}] * (MAX_REPORTED_ERRORS - 5)
+    windows = [{'duration_ms': 1000}] * MAX_REPORTED_ERRORS
+    with pytest.raises(InvalidPayload) as info:
+        validate(readings, 'a', windows)
+    errors = info.value.errors
+    assert len(errors) == MAX_REPORTED_ERRORS
+    assert sum('window' in error for error in errors) == 5
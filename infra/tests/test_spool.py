@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import spool
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, 'SPOOL_DIR', str(tmp_path))
+    monkeypatch.setattr(spool, '_current', None)
+    monkeypatch.setattr(spool, '_last_replay', 0.0)
+    return tmp_path
+
+
+def suffixes(directory):
+    return sorted(os.path.splitext(name)[1] for name in os.listdir(directory))
+
+
+def test_append_then_replay():
+    spool.append('bucket', 'ms', b'environment,device=a current=1 1')
+    spool.append('bucket', 'ms', b'environment,device=a current=2 2\n')
+    assert spool.pending()
+    writes = []
+    sent = spool.replay(lambda *args: writes.append(args), force=True)
+    assert writes == [('bucket', 'ms', b'environment,device=a current=1 1\nenvironment,device=a current=2 2\n')]
+    assert sent == len(writes[0][2])
+    assert not spool.pending()
+
+
+def test_new_segment_per_bucket_and_precision(spool_dir):
+    spool.append('b1', 'ms', b'x 1')
+    spool.append('b1', 's', b'x 2')
+    spool.append('b2', 's', b'x 3')
+    assert suffixes(spool_dir) == ['.lp', '.lp', '.open']
+    writes = []
+    spool.replay(lambda *args: writes.append(args), force=True)
+    assert [args[:2] for args in writes] == [('b1', 'ms'), ('b1', 's'), ('b2', 's')]
+
+
+def test_segment_rotation_by_size(spool_dir, monkeypatch):
+    monkeypatch.setattr(spool, 'SEGMENT_MAX_BYTES', 60)
+    for index in range(5):
+        spool.append('bucket', 'ms', f'environment,device=a current={index}'.encode())
+    assert len(os.listdir(spool_dir)) > 1
+    writes = []
+    spool.replay(lambda *args: writes.append(args), force=True)
+    assert b''.join(args[2] for args in writes).count(b'\n') == 5
+
+
+def test_retryable_failure_keeps_segment(spool_dir):
+    spool.append('bucket', 'ms', b'x 1')
+
+    def fail(*args):
+        raise ConnectionError('offline')
+
+    with pytest.raises(ConnectionError):
+        spool.replay(fail, force=True)
+    assert suffixes(spool_dir) == ['.lp']
+    assert spool.replay(lambda *args: None, force=True) == 4
+
+
+def test_permanent_failure_quarantines_segment(spool_dir):
+    spool.append('b1', 'ms', b'bad 1')
+    spool.append('b2', 'ms', b'good 1')
+    writes = []
+
+    def write(bucket, precision, payload):
+        if bucket == 'b1':
+            raise ValueError('400')
+        writes.append(bucket)
+
+    spool.replay(write, force=True, is_retryable=lambda error: not isinstance(error, ValueError))
+    assert writes == ['b2']
+    assert suffixes(spool_dir) == ['.rejected']
+    assert spool.stats()['rejected_segments'] >= 1
+    assert not spool.pending()
+
+
+def test_invalid_header_quarantines_segment(spool_dir):
+    (spool_dir / '00000000000000000001-x.lp').write_bytes(b'garbage\nx 1\n')
+    assert spool.replay(lambda *args: None, force=True) == 0
+    assert suffixes(spool_dir) == ['.rejected']
+
+
+def test_replay_interval(monkeypatch):
+    monkeypatch.setattr(spool, 'REPLAY_INTERVAL', 3600)
+    spool.append('bucket', 'ms', b'x 1')
+    assert spool.replay(lambda *args: None) == 4
+    spool.append('bucket', 'ms', b'x 2')
+    assert spool.replay(lambda *args: None) == 0
+
+
+def test_limit_evicts_rejected_then_oldest(spool_dir, monkeypatch):
+    (spool_dir / '00000000000000000001-x.rejected').write_bytes(b'r' * 100)
+    monkeypatch.setattr(spool, 'SEGMENT_MAX_BYTES', 100)
+    monkeypatch.setattr(spool, 'SPOOL_MAX_BYTES', 250)
+    for _ in range(3):
+        spool.append('bucket', 'ms', b'y' * 80)
+    names = os.listdir(spool_dir)
+    assert not any(name.endswith('.rejected') for name in names)
+    assert sum(os.path.getsize(spool_dir / name) for name in names) <= 250